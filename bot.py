@@ -15,15 +15,27 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import os
 import asyncio
 import discord
-import time
+import logging
 
+import config
 from discord.ext import commands
-from collections import deque
 from config import TOKEN, PREFIX
+from utils.extensions import ExtensionLoader, discover_extensions
 from utils.helpers import bot_manager, is_user_allowed
+from utils.log import get_logger, log_event, setup_logging
+
+log = get_logger()
+event_log = get_logger("events")
+
+
+class Context(commands.Context):
+    """A command context whose replies go out through the outbox's priority lane."""
+
+    async def send(self, *args, **kwargs):
+        return await bot_manager.outbox.reply(self.channel, super().send(*args, **kwargs))
+
 
 # Intents setup
 intents = discord.Intents.default()
@@ -34,64 +46,51 @@ intents.members = True
 
 # Initialize bot
 bot = commands.Bot(command_prefix=PREFIX, intents=intents)
+bot_manager.user_cache.bind(bot)
 
 
-async def load_extensions():
-    """Load all cogs dynamically."""
-    for folder in ["user", "admin", "owner"]:
-        folder_path = f"cogs/{folder}"
-        for file in os.listdir(folder_path):
-            if file.endswith(".py") and not file.startswith("__"):
-                extension = f"cogs.{folder}.{file[:-3]}"
-                try:
-                    await bot.load_extension(extension)
-                    print(f"Loaded extension: {extension}")
-                except Exception as e:
-                    print(f"Failed to load extension {extension}: {e}")
-
-    """Load help command"""
-    try:
-        await bot.load_extension("cogs.help")
-        print(f"Loaded extension: cogs.help")
-    except Exception as e:
-        print(f"Failed to load help: {e}")
+# Cogs load one at a time, timed; deferred ones wait until the bot is connected
+extension_loader = ExtensionLoader(
+    bot, discover_extensions(), deferred=getattr(config, "DEFERRED_EXTENSIONS", ()))
 
 
 @bot.event
 async def on_ready():
-    print("ready")
-    await bot_manager.load_users()
-    await bot_manager.load_summons()
-    await bot_manager.load_currency_data()
-    await bot_manager.load_shop()
-    await bot_manager.load_loot_tables()
-    print(f"Logged in as {bot.user}")
-    print("Available Commands:")
-    for command in bot.commands:
-        print(f"{command.name}: {command.help or 'No description'}")
+    log.info("ready")
+    log.info("Logged in as %s", bot.user)
+    await extension_loader.load_deferred()
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Available Commands:")
+        for command in bot.commands:
+            log.debug("%s: %s", command.name, command.help or "No description")
 
 
 @bot.event
 async def on_message(message):
-    print(message)
+    # Nothing is formatted here unless debug logging is on (and sampled)
+    if event_log.isEnabledFor(logging.DEBUG):
+        log_event(event_log, logging.DEBUG, "message", guild=getattr(message.guild, "id", None),
+                  channel=message.channel.id, author=message.author.id, bot=message.author.bot)
     if message.author.bot or not is_user_allowed():
-        print(message.author)
         return
 
-    # Check if user is AFK and clear status
+    # Answer any prompt (e.g., a wager) waiting on this user in this channel
+    bot_manager.replies.dispatch(message)
+
+    # Check if user is AFK and clear status (notices are batched per channel)
     if message.author.id in bot_manager.afk:
         del bot_manager.afk[message.author.id]
-        await message.channel.send(f"Welcome back, {message.author.mention}! You are no longer AFK.")
+        bot_manager.outbox.notice(message.channel, f"Welcome back, {message.author.mention}! You are no longer AFK.")
 
     # Notify if someone mentions an AFK user
     for user in message.mentions:
-        print(user)
         if user.id in bot_manager.afk:
             afk_message = bot_manager.afk[user.id]
-            user = await bot.fetch_user(user.id)
-            await message.channel.send(f"{user} is AFK: {afk_message}")
+            user = await bot_manager.user_cache.resolve(user.id) or user
+            bot_manager.outbox.notice(message.channel, f"{user} is AFK: {afk_message}")
 
-    await bot.process_commands(message)
+    # Like bot.process_commands, but replies get priority over notices
+    await bot.invoke(await bot.get_context(message, cls=Context))
 
 
 @bot.event
@@ -100,12 +99,7 @@ async def on_message_delete(message):
     if message.author.bot or not message.guild:
         return
 
-    guild_id = message.guild.id
-    bot_manager.deleted_messages.setdefault(guild_id, deque(maxlen=50)).append({
-        "content": message.content,
-        "author": message.author.id,
-        "timestamp": time.time()
-    })
+    bot_manager.deleted_messages.add(message.guild.id, message.channel.id, message.author.id, message.content)
 
 
 @bot.event
@@ -114,20 +108,26 @@ async def on_message_edit(before, after):
     if before.author.bot or not before.guild:
         return
 
-    guild_id = before.guild.id
-    bot_manager.edited_messages.setdefault(guild_id, deque(maxlen=50)).append({
-        "old_content": before.content,
-        "new_content": after.content,
-        "author": before.author.id,
-        "timestamp": time.time()
-    })
+    bot_manager.edited_messages.add(
+        before.guild.id, before.channel.id, before.author.id, before.content, after.content)
 
 
 async def main():
     """Main entry point for the bot."""
-    async with bot:
-        await load_extensions()
-        await bot.start(TOKEN)
+    bot_manager.logs = setup_logging(config)
+    try:
+        async with bot:
+            # Data is loaded before connecting: a command run while loading
+            # would otherwise change the empty defaults, not the real data
+            await bot_manager.load_all()
+            await extension_loader.load()
+            try:
+                await bot.start(TOKEN)
+            finally:
+                # Write out anything still waiting in the write-behind buffer
+                await bot_manager.close()
+    finally:
+        bot_manager.logs.stop()
 
 
 if __name__ == "__main__":
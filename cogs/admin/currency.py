@@ -15,8 +15,13 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import csv
+import io
+import time
 import discord
 from discord.ext import commands
+from utils.balances import BALANCE_MAX, BALANCE_MIN
+from utils.cooldowns import COOLDOWNS
 from utils.helpers import bot_manager
 
 
@@ -32,26 +37,200 @@ class CurrencyAdmin(commands.Cog):
         """Check if the user is a bot-level admin."""
         return user_id in bot_manager.admins
 
-    def load_user_data(self, user_id):
-        """Retrieve user currency data."""
-        user_id = str(user_id)
-        if user_id not in bot_manager.currency_data:
-            bot_manager.currency_data[user_id] = {"money": 0, "cooldowns": {}}
-        return bot_manager.currency_data[user_id]
-
     @commands.command()
     async def setbalance(self, ctx, member: discord.Member, amount: int):
         """Set the balance of a user (Bot Owner or Admin only)."""
-        if not (self.is_bot_owner(str(ctx.author.id)) or self.is_bot_admin(str(ctx.author.id))):
-            await ctx.add_reaction("❌")
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        if not BALANCE_MIN <= amount <= BALANCE_MAX:
+            await ctx.send(f"The balance must be between {BALANCE_MIN} and {BALANCE_MAX} coins.")
             return
 
-        user_data = self.load_user_data(member.id)
-        user_data["wallet"] = amount
+        bot_manager.get_account(member.id).wallet = amount
 
-        await bot_manager.save_currency_data()
+        await bot_manager.save_currency_data(member.id)
         await ctx.send(f"Set {member.mention}'s balance to {amount} coins.")
 
+    def is_staff(self, ctx):
+        """Check if the command author is the bot owner or a bot-level admin."""
+        user_id = str(ctx.author.id)
+        return self.is_bot_owner(user_id) or self.is_bot_admin(user_id)
+
+    async def commit_bulk(self, progress, summary, started, *user_ids):
+        """
+        Persist a bulk change with one flush and report how long it took.
+        :param progress: The progress message to edit.
+        :param summary: What was changed.
+        :param started: `time.perf_counter()` when the operation began.
+        :param user_ids: The accounts changed (all if omitted).
+        """
+        await progress.edit(content=f"{summary} Saving...")
+        bot_manager.mark_dirty("currency", *user_ids)
+        await bot_manager.flush()
+        await progress.edit(content=f"{summary} Done in {time.perf_counter() - started:.2f}s.")
+
+    @commands.group(invoke_without_command=True)
+    async def economy(self, ctx):
+        """
+        Economy-wide operations (Bot Owner or Admin only).
+        Use subcommands like `stats`, `airdrop`, `tax`, `resetcooldowns` or `setbalances`.
+        """
+        await ctx.send("Available subcommands: `stats`, `airdrop`, `tax`, `resetcooldowns`, `setbalances`.")
+
+    @economy.command()
+    async def stats(self, ctx):
+        """Show money supply, balance distribution and inequality."""
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        store = bot_manager.currency_data
+        if not len(store):
+            await ctx.send("No one has a currency account yet.")
+            return
+
+        # Statistics cover interest owed up to now
+        bot_manager.accrue_all_interest()
+        wallets, banks = store.sums["wallet"], store.sums["bank"]
+        supply = wallets + banks
+        gini = store.gini()
+
+        embed = discord.Embed(title="📊 Economy Statistics", color=discord.Color.gold())
+        embed.add_field(name="Accounts", value=f"{len(store)}")
+        embed.add_field(name="Money Supply", value=f"{supply} coins")
+        embed.add_field(name="Average", value=f"{supply // len(store)} coins")
+        if supply > 0:
+            embed.add_field(
+                name="Wallet / Bank",
+                value=f"{wallets} ({wallets / supply:.1%}) / {banks} ({banks / supply:.1%})",
+                inline=False,
+            )
+        embed.add_field(name="Richest", value=f"{store.quantile(1)} coins")
+        embed.add_field(name="Median", value=f"{store.quantile(0.5)} coins")
+        embed.add_field(name="Poorest", value=f"{store.quantile(0)} coins")
+        embed.add_field(
+            name="Percentiles (25th / 75th / 90th / 99th)",
+            value=" / ".join(str(store.quantile(q)) for q in (0.25, 0.75, 0.9, 0.99)),
+            inline=False,
+        )
+        embed.add_field(name="Gini Coefficient", value="n/a" if gini is None else f"{gini:.3f}")
+        await ctx.send(embed=embed)
+
+    @economy.command()
+    async def airdrop(self, ctx, role: discord.Role, amount: int):
+        """
+        Give every member of a role the same amount of coins.
+        :param role: The role whose members get paid.
+        :param amount: The coins each member gets.
+        """
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        if amount <= 0:
+            await ctx.send("The airdrop amount must be positive.")
+            return
+
+        started = time.perf_counter()
+        user_ids = [member.id for member in role.members if not member.bot]
+        if not user_ids:
+            await ctx.send(f"No members have the {role.name} role.")
+            return
+
+        progress = await ctx.send(f"Airdropping {amount} coins to {len(user_ids)} members...")
+        try:
+            paid = bot_manager.currency_data.credit_many(user_ids, amount)
+        except ValueError as e:
+            await progress.edit(content=f"Airdrop cancelled: {e}")
+            return
+        await self.commit_bulk(
+            progress, f"Airdropped {amount} coins to {paid} members of {role.name}.", started, *user_ids)
+
+    @economy.command()
+    async def tax(self, ctx, percent: float):
+        """
+        Take a percentage of every user's wallet and bank.
+        :param percent: The tax rate, e.g. 2.5 for 2.5%.
+        """
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        if not 0 < percent <= 100:
+            await ctx.send("The tax rate must be more than 0% and at most 100%.")
+            return
+
+        started = time.perf_counter()
+        progress = await ctx.send(f"Taxing {len(bot_manager.currency_data)} accounts at {percent}%...")
+        # Tax up-to-date bank balances
+        bot_manager.accrue_all_interest()
+        collected = bot_manager.currency_data.tax(round(percent * 100))
+        await self.commit_bulk(progress, f"Collected {collected} coins in {percent}% tax.", started)
+
+    @economy.command()
+    async def resetcooldowns(self, ctx, *names):
+        """
+        Clear cooldowns for every user.
+        :param names: The cooldowns to clear (e.g., daily beg); all if omitted.
+        """
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        unknown = [name for name in names if name not in COOLDOWNS]
+        if unknown:
+            await ctx.send(f"Unknown cooldowns: {', '.join(unknown)}. Choose from: {', '.join(COOLDOWNS)}.")
+            return
+
+        started = time.perf_counter()
+        names = names or tuple(COOLDOWNS)
+        progress = await ctx.send(f"Resetting {', '.join(names)} cooldowns...")
+        bot_manager.currency_data.reset_cooldowns([COOLDOWNS[name].field for name in names])
+        await self.commit_bulk(
+            progress, f"Reset {', '.join(names)} cooldowns for {len(bot_manager.currency_data)} users.", started)
+
+    @economy.command()
+    async def setbalances(self, ctx):
+        """
+        Set wallet balances from an attached CSV file of `user_id,amount` rows.
+        """
+        if not self.is_staff(ctx):
+            await ctx.message.add_reaction("❌")
+            return
+
+        if not ctx.message.attachments:
+            await ctx.send("Attach a CSV file with one `user_id,amount` row per user.")
+            return
+
+        started = time.perf_counter()
+        progress = await ctx.send("Reading balances...")
+        text = (await ctx.message.attachments[0].read()).decode("utf-8-sig", errors="replace")
+
+        balances = {}
+        skipped = 0
+        for row in csv.reader(io.StringIO(text)):
+            try:
+                user_id, amount = (int(value) for value in row[:2])
+            except ValueError:
+                # Covers headers, blank lines and malformed rows
+                skipped += 1
+                continue
+            if not BALANCE_MIN <= amount <= BALANCE_MAX:
+                skipped += 1
+                continue
+            balances[user_id] = amount
+
+        if not balances:
+            await progress.edit(content="No valid `user_id,amount` rows found.")
+            return
+
+        await progress.edit(content=f"Setting {len(balances)} balances...")
+        bot_manager.currency_data.set_many(balances)
+        summary = f"Set {len(balances)} balances" + (f" ({skipped} rows skipped)." if skipped else ".")
+        await self.commit_bulk(progress, summary, started, *balances)
+
 # Add cog to bot
 
 
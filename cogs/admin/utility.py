@@ -22,11 +22,8 @@ class AdminUtilities(commands.Cog):
     @commands.command(aliases=["cs"])
     async def clearsnipes(self, ctx):
         """Clear the snipe and editsnipe caches."""
-        guild_id = ctx.guild.id
-        if guild_id in bot_manager.deleted_messages:
-            bot_manager.deleted_messages[guild_id].clear()
-        if guild_id in bot_manager.edited_messages:
-            bot_manager.edited_messages[guild_id].clear()
+        bot_manager.deleted_messages.clear(ctx.guild.id)
+        bot_manager.edited_messages.clear(ctx.guild.id)
         await ctx.send("Cleared the snipe and editsnipe caches.")
 
     @commands.command()
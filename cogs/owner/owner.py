@@ -91,6 +91,79 @@ class Owner(commands.Cog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command()
+    async def logs(self, ctx, count: int = 20, level: str = None):
+        """
+        Show the most recent log lines (Bot Owner only).
+        :param count: The number of lines to show.
+        :param level: Optionally change the log level first (e.g., DEBUG).
+        """
+        if not self.is_bot_owner(str(ctx.author.id)):
+            await ctx.message.add_reaction("❌")
+            return
+
+        if bot_manager.logs is None:
+            await ctx.send("Logging is not set up.")
+            return
+
+        if level:
+            try:
+                bot_manager.logs.set_level(level.upper())
+            except ValueError:
+                await ctx.send(f"Unknown log level: {level}.")
+                return
+            await ctx.send(f"Log level set to {level.upper()}.")
+
+        lines = bot_manager.logs.buffer.tail(count)
+        if not lines:
+            await ctx.send("The log buffer is empty.")
+            return
+
+        # Send as code blocks within Discord's 2000 character limit
+        chunk = ""
+        for line in lines:
+            line = line[:1900]
+            if len(chunk) + len(line) + 1 > 1900:
+                await ctx.send(f"```\n{chunk}```")
+                chunk = ""
+            chunk += line + "\n"
+        await ctx.send(f"```\n{chunk}```")
+
+    @commands.command()
+    async def cachestats(self, ctx):
+        """Show how user lookups were served (Bot Owner only)."""
+        if not self.is_bot_owner(str(ctx.author.id)):
+            await ctx.message.add_reaction("❌")
+            return
+
+        stats = bot_manager.user_cache.stats
+        hits = stats["gateway"] + stats["cached"]
+        lookups = hits + stats["fetched"] + stats["shared"]
+        hit_rate = f"{hits / lookups:.1%}" if lookups else "n/a"
+        await ctx.send(
+            f"**User cache:** {hit_rate} hit rate over {lookups} lookups\n"
+            f"Gateway: {stats['gateway']}, LRU: {stats['cached']}, REST fetches: {stats['fetched']} "
+            f"({stats['failed']} failed), shared in-flight: {stats['shared']}\n"
+            f"Cached users: {len(bot_manager.user_cache)}"
+        )
+
+    @commands.command()
+    async def outbox(self, ctx):
+        """Show queued outbound notices per channel (Bot Owner only)."""
+        if not self.is_bot_owner(str(ctx.author.id)):
+            await ctx.message.add_reaction("❌")
+            return
+
+        outbox = bot_manager.outbox
+        stats = outbox.stats
+        busiest = ", ".join(f"<#{channel_id}>: {depth}" for channel_id, depth in outbox.busiest()) or "none"
+        await ctx.send(
+            f"**Outbox:** {outbox.depth()} queued (peak {stats['peak_depth']} in one channel)\n"
+            f"Queued: {stats['queued']}, sent: {stats['sent']} ({stats['failed']} failed), "
+            f"merged into other messages: {stats['merged']}, replies sent ahead of notices: {stats['replies']}\n"
+            f"Busiest channels: {busiest}"
+        )
+
     @commands.command()
     async def stop(self, ctx):
         """Stop the bot (owner only)."""
@@ -99,6 +172,7 @@ class Owner(commands.Cog):
             return
 
         await ctx.send("Shutting down...")
+        await bot_manager.flush()
         await self.bot.close()
 
     @commands.command()
@@ -16,67 +16,68 @@
 
 
 import discord
-from discord.ext import commands, tasks
-from Crypto.Random import random
-import time
+from discord.ext import commands
 import asyncio
 from utils.helpers import bot_manager, is_user_allowed
+from utils.cache import VersionedCache
+from utils.cooldowns import format_duration
+from utils.rng import EntropyPool
+from utils.log import get_logger
+from utils.transactions import InsufficientFunds
+import config
 from config import PREFIX
 
+log = get_logger("currency")
+
 
 class Currency(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.apply_interest_task.start()
-
-    def get_user_data(self, user_id):
-        """Retrieve or initialize data for a user."""
-        user_id = str(user_id)
-        if user_id not in bot_manager.currency_data:
-            bot_manager.currency_data[user_id] = {
-                "wallet": 0,
-                "bank": 0,
-                "daily_claimed": False,
-            }
-        return bot_manager.currency_data[user_id]
-
-    async def handle_cooldown(self, ctx, user_id, cooldown_key, reward, cooldown_time):
+        # Game rolls are served from a prefetched pool of cryptographic bytes
+        self.rng = EntropyPool(seed=getattr(config, "RNG_SEED", None))
+        self.leaderboard_pages = VersionedCache()
+        # (user ID, cooldown name) pairs to DM about when the cooldown ends
+        self.reminders = set()
+
+    async def cog_load(self):
+        bot_manager.cooldowns.subscribe(self.send_reminder)
+
+    async def cog_unload(self):
+        bot_manager.cooldowns.unsubscribe(self.send_reminder)
+
+    async def send_reminder(self, user_id, cooldown_name):
+        """DM a user who asked to be reminded that a cooldown has run out."""
+        if (user_id, cooldown_name) not in self.reminders:
+            return
+        self.reminders.discard((user_id, cooldown_name))
+        user = await bot_manager.user_cache.resolve(user_id)
+        if user is None:
+            return
+        try:
+            await user.send(f"Your `{cooldown_name}` cooldown is over. Use `{PREFIX}{cooldown_name}` to claim it!")
+        except discord.HTTPException:
+            pass  # DMs closed
+
+    async def handle_cooldown(self, ctx, cooldown_name, reward):
         """
         Handle cooldown-based currency commands (daily, weekly, monthly).
         :param ctx: Command context.
-        :param user_id: User's ID.
-        :param cooldown_key: The cooldown key to track.
+        :param cooldown_name: The cooldown guarding the reward (e.g., "daily").
         :param reward: The reward amount.
-        :param cooldown_time: Cooldown duration in seconds.
         """
-        user_data = self.get_user_data(user_id)
-        now = time.time()
-        last_used = user_data.get(cooldown_key, 0)
-
-        if now - last_used < cooldown_time:
-            remaining = cooldown_time - (now - last_used)
-
-            # Calculate remaining time
-            # 86400 seconds in a day
-            days, remainder = divmod(int(remaining), 86400)
-            hours, remainder = divmod(remainder, 3600)
-            minutes, seconds = divmod(remainder, 60)
-
-            # Format the message
-            if days > 0:
-                time_message = f"{days}d {hours}h {minutes}m {seconds}s"
-            else:
-                time_message = f"{hours}h {minutes}m {seconds}s"
-
+        user_id = ctx.author.id
+        account = bot_manager.get_account(user_id)
+        remaining = bot_manager.cooldowns.remaining(account, cooldown_name)
+        if remaining:
             await ctx.send(
-                f"You need to wait {time_message} before claiming again, {ctx.author.mention}!"
+                f"You need to wait {format_duration(remaining)} before claiming again, {ctx.author.mention}!"
             )
             return
 
         # Update user data
-        user_data["wallet"] += reward
-        user_data[cooldown_key] = now
-        await bot_manager.save_currency_data()
+        account.wallet += reward
+        bot_manager.cooldowns.start(account, cooldown_name)
+        await bot_manager.save_currency_data(user_id)
 
         await ctx.send(f"{ctx.author.mention}, you claimed {reward} coins!")
 
@@ -86,10 +87,7 @@ class Currency(commands.Cog):
         """
         Display the user's wallet balance.
         """
-        user_id = str(ctx.author.id)
-        user_data = self.get_user_data(user_id)
-
-        wallet_balance = user_data.get("wallet", 0)
+        wallet_balance = bot_manager.get_account(ctx.author.id).wallet
 
         embed = discord.Embed(
             title=f"{ctx.author.display_name}'s Wallet Balance 💰",
@@ -104,19 +102,38 @@ class Currency(commands.Cog):
     @is_user_allowed()
     async def daily(self, ctx):
         """Claim your daily reward."""
-        await self.handle_cooldown(ctx, ctx.author.id, "last_daily", 500, 86400)
+        await self.handle_cooldown(ctx, "daily", 500)
 
     @commands.command()
     @is_user_allowed()
     async def weekly(self, ctx):
         """Claim your weekly reward."""
-        await self.handle_cooldown(ctx, ctx.author.id, "last_weekly", 3500, 604800)
+        await self.handle_cooldown(ctx, "weekly", 3500)
 
     @commands.command()
     @is_user_allowed()
     async def monthly(self, ctx):
         """Claim your monthly reward."""
-        await self.handle_cooldown(ctx, ctx.author.id, "last_monthly", 15000, 2592000)
+        await self.handle_cooldown(ctx, "monthly", 15000)
+
+    @commands.command()
+    @is_user_allowed()
+    async def remind(self, ctx, cooldown_name: str):
+        """
+        Get a DM when one of your cooldowns runs out.
+        :param cooldown_name: The cooldown (daily, weekly, monthly or beg).
+        """
+        cooldown_name = cooldown_name.lower()
+        if cooldown_name not in ("daily", "weekly", "monthly", "beg"):
+            await ctx.send("You can be reminded about `daily`, `weekly`, `monthly` or `beg`.")
+            return
+
+        remaining = bot_manager.cooldowns.remaining(bot_manager.get_account(ctx.author.id), cooldown_name)
+        if not remaining:
+            await ctx.send(f"{ctx.author.mention}, your `{cooldown_name}` is ready now!")
+            return
+        self.reminders.add((ctx.author.id, cooldown_name))
+        await ctx.send(f"{ctx.author.mention}, I'll DM you in {format_duration(remaining)} when `{cooldown_name}` is ready.")
 
     @commands.command()
     @is_user_allowed()
@@ -126,84 +143,72 @@ class Currency(commands.Cog):
             await ctx.send("You can only gamble a positive amount of money.")
             return
 
-        user_id = str(ctx.author.id)
-        user_data = self.get_user_data(user_id)
-
-        if user_data["wallet"] < amount:
+        user_id = ctx.author.id
+        try:
+            async with bot_manager.transaction(user_id) as txn:
+                txn.require(user_id, amount)
+                won = bool(self.rng.getrandbits(1))
+                if won:
+                    txn.credit(user_id, amount)
+                else:
+                    txn.debit(user_id, amount)
+        except InsufficientFunds:
             await ctx.send("You don't have enough money in your wallet to gamble that amount.")
             return
-        
-        if bool(random.getrandbits(1)):
-            user_data["wallet"] += amount
+
+        if won:
             await ctx.send(f"Congratulations {ctx.author.mention}, you won {amount} coins!")
         else:
-            user_data["wallet"] -= amount
             await ctx.send(f"Sorry {ctx.author.mention}, you lost {amount} coins.")
 
-        await bot_manager.save_currency_data()
-
     @commands.command()
     @is_user_allowed()
     async def beg(self, ctx):
         """Beg for coins with an hour-long cooldown."""
-        user_id = str(ctx.author.id)
-        user_data = self.get_user_data(user_id)
-
-        now = time.time()
-        last_beg = user_data.get("last_beg", 0)
-        cooldown = 300
+        user_id = ctx.author.id
+        account = bot_manager.get_account(user_id)
 
-        if now - last_beg < cooldown:
-            remaining = cooldown - (now - last_beg)
-            minutes, seconds = divmod(int(remaining), 60)
+        remaining = bot_manager.cooldowns.remaining(account, "beg")
+        if remaining:
             await ctx.send(
-                f"You need to wait {minutes}m {seconds}s before you can beg again, {ctx.author.mention}!"
+                f"You need to wait {format_duration(remaining)} before you can beg again, {ctx.author.mention}!"
             )
             return
-        
-        if bool(random.getrandbits(1)):
-            reward = random.randint(10, 250)
-            if user_id == "691738362612154449":
-                reward = random.randint(10, 150)
-            user_data["wallet"] += reward
-            user_data["last_beg"] = now
-
-            await bot_manager.save_currency_data()
+
+        bot_manager.cooldowns.start(account, "beg")
+        if bool(self.rng.getrandbits(1)):
+            reward = self.rng.randint(10, 250)
+            if user_id == 691738362612154449:
+                reward = self.rng.randint(10, 150)
+            account.wallet += reward
+
+            await bot_manager.save_currency_data(user_id)
             await ctx.send(f"{ctx.author.mention}, you begged and received {reward} coins!")
         else:
-            user_data["last_beg"] = now
+            await bot_manager.save_currency_data(user_id)
             await ctx.send(f"{ctx.author.mention}, you begged and recieved nothing")
 
     @commands.command()
     @is_user_allowed()
     async def bankruptcy(self, ctx):
         """Reset balance to 500 and set all cooldowns to maximum."""
-        user_id = str(ctx.author.id)
-        user_data = self.get_user_data(user_id)
-
-        now = time.time()
-        last_bankruptcy = user_data.get("last_bankruptcy", 0)
-        cooldown = 3600
+        user_id = ctx.author.id
+        account = bot_manager.get_account(user_id)
 
-        if now - last_bankruptcy < cooldown:
-            remaining = cooldown - (now - last_bankruptcy)
-            minutes, seconds = divmod(int(remaining), 60)
+        remaining = bot_manager.cooldowns.remaining(account, "bankruptcy")
+        if remaining:
             await ctx.send(
-                f"You need to wait {minutes}m {seconds}s before you can beg again, {ctx.author.mention}!"
+                f"You need to wait {format_duration(remaining)} before declaring bankruptcy again, "
+                f"{ctx.author.mention}!"
             )
             return
 
         # Update user data
-        user_data.update({
-            "wallet": 500,
-            "bank": 0,
-            "last_daily": now,
-            "last_weekly": now,
-            "last_monthly": now,
-            "last_bankruptcy": now,
-        })
-
-        await bot_manager.save_currency_data()
+        account.wallet = 500
+        account.bank = 0
+        bot_manager.cooldowns.start(account, "daily", "weekly", "monthly", "bankruptcy")
+
+        await bot_manager.save_currency_data(user_id)
         await ctx.send(
             f"{ctx.author.mention}, you've declared bankruptcy! Your balance is now 500 coins, "
             "and all cooldowns have been set to their maximum."
@@ -211,48 +216,111 @@ class Currency(commands.Cog):
 
     @commands.command(aliases=["lb"])
     @is_user_allowed()
-    async def leaderboard(self, ctx, page: int = 1):
+    async def leaderboard(self, ctx, page: str = "1"):
         """
         Display a paginated leaderboard.
-        :param page: The page number to display.
+        :param page: The page number to display, or "me" for the page you are on.
         """
         # Constants
         items_per_page = 10  # Number of users to display per page
         total_users = len(bot_manager.currency_data)
+        total_pages = (total_users + items_per_page - 1) // items_per_page
+
+        # Bring every balance up to date so the ranking is current
+        bot_manager.accrue_all_interest()
+
+        if page.lower() == "me":
+            rank = bot_manager.currency_data.rank(ctx.author.id)
+            if rank is None:
+                await ctx.send(f"{ctx.author.mention}, you're not on the leaderboard yet.")
+                return
+            page = (rank - 1) // items_per_page + 1
+        elif page.isdigit():
+            page = int(page)
+        else:
+            await ctx.send("Usage: `,lb <page>` or `,lb me`.")
+            return
 
         # Calculate pagination
-        total_pages = (total_users + items_per_page - 1) // items_per_page
         if page < 1 or page > total_pages:
             await ctx.send(f"Invalid page number. Please select a page between 1 and {total_pages}.")
             return
 
-        # Retrieve and sort user data by total currency (wallet + bank)
-        sorted_data = sorted(
-            bot_manager.currency_data.items(),
-            key=lambda item: item[1].get("wallet", 0) + item[1].get("bank", 0),
-            reverse=True
-        )
+        # Rendered pages stay valid until any balance changes
+        store = bot_manager.currency_data
+        leaderboard_message = await self.leaderboard_pages.get(
+            page, (id(store), store.version),
+            lambda: self.render_leaderboard_page(ctx.guild, page, total_pages, items_per_page))
 
-        # Determine start and end indices for the page
+        # Send the leaderboard message
+        await ctx.send(leaderboard_message)
+
+    async def render_leaderboard_page(self, guild, page, total_pages, items_per_page):
+        """
+        Build the text of one leaderboard page.
+        :param guild: The guild to resolve unknown users in, if any.
+        :param page: The page number.
+        :param total_pages: The number of pages.
+        :param items_per_page: Users shown per page.
+        """
+        # Only look up the accounts on this page, copied before any await
         start_idx = (page - 1) * items_per_page
-        end_idx = start_idx + items_per_page
-        page_data = sorted_data[start_idx:end_idx]
+        rows = [
+            (account.user_id, account.total, account.wallet, account.bank)
+            for account in bot_manager.currency_data.ranked(start_idx, start_idx + items_per_page)
+        ]
+
+        # Names come from the user cache; members it lacks are requested
+        # in one gateway batch, and only users outside the guild over REST
+        user_cache = bot_manager.user_cache
+        names = {}
+        for user_id, *_ in rows:
+            user = user_cache.get(user_id)
+            if user:
+                names[user_id] = user.name
+        missing = [user_id for user_id, *_ in rows if user_id not in names]
+        if missing and guild is not None:
+            try:
+                for member in await guild.query_members(user_ids=missing, limit=len(missing)):
+                    user_cache.put(member)
+                    names[member.id] = member.name
+            except (discord.ClientException, asyncio.TimeoutError) as e:
+                log.warning("Failed to resolve leaderboard users: %s", e)
+        missing = [user_id for user_id in missing if user_id not in names]
+        for user_id, user in (await user_cache.resolve_many(missing)).items():
+            if user:
+                names[user_id] = user.name
 
         # Create the leaderboard message
         leaderboard_message = f"**🏆 Leaderboard (Page {page}/{total_pages}) 🏆**\n\n"
-        for i, (user_id, data) in enumerate(page_data, start=start_idx + 1):
-            user = self.bot.get_user(int(user_id))
-            username = user.name if user else f"User {user_id}"
-            wallet = data.get("wallet", 0)
-            bank = data.get("bank", 0)
-            total = wallet + bank
+        for i, (user_id, total, wallet, bank) in enumerate(rows, start=start_idx + 1):
+            username = names.get(user_id, f"User {user_id}")
             leaderboard_message += f"{i}. {username}: {total} coins (Wallet: {wallet}, Bank: {bank})\n"
 
         # Add navigation footer
-        leaderboard_message += f"\nUse `,lb <page>` to view other pages."
+        leaderboard_message += f"\nUse `,lb <page>` to view other pages, or `,lb me` to find yourself."
+        return leaderboard_message
 
-        # Send the leaderboard message
-        await ctx.send(leaderboard_message)
+    @commands.command()
+    @is_user_allowed()
+    async def rank(self, ctx, member: discord.Member = None):
+        """
+        Show a user's position on the leaderboard.
+        :param member: The user to look up (defaults to yourself).
+        """
+        member = member or ctx.author
+        bot_manager.accrue_all_interest()
+        rank = bot_manager.currency_data.rank(member.id)
+        if rank is None:
+            await ctx.send(f"{member.display_name} isn't on the leaderboard yet.")
+            return
+
+        account = bot_manager.currency_data.get(member.id)
+        total_users = len(bot_manager.currency_data)
+        await ctx.send(
+            f"**{member.display_name}** is ranked **#{rank}** of {total_users} "
+            f"with {account.total} coins (Wallet: {account.wallet}, Bank: {account.bank})."
+        )
 
     @commands.group(invoke_without_command=True)
     @is_user_allowed()
@@ -272,28 +340,22 @@ class Currency(commands.Cog):
             await ctx.send("The wager amount must be greater than zero.")
             return
 
-        challenger_id = str(ctx.author.id)
-        opponent_id = str(opponent.id)
+        challenger_account = bot_manager.get_account(ctx.author.id)
+        opponent_account = bot_manager.get_account(opponent.id)
 
-        challenger_data = self.get_user_data(challenger_id)
-        opponent_data = self.get_user_data(opponent_id)
-
-        if challenger_data["wallet"] < amount:
+        if challenger_account.wallet < amount:
             await ctx.send(f"{ctx.author.mention}, you don't have enough coins for this wager.")
             return
 
-        if opponent_data["wallet"] < amount:
+        if opponent_account.wallet < amount:
             await ctx.send(f"{opponent.mention} doesn't have enough coins for this wager.")
             return
 
         await ctx.send(f"{ctx.author.mention}, do you choose heads or tails? Type `heads` or `tails`.")
 
-        def check_heads_or_tails(m):
-            return m.author == ctx.author and m.content.lower() in ["heads", "tails"]
-
         try:
-            challenger_choice_msg = await self.bot.wait_for("message", timeout=30.0, check=check_heads_or_tails)
-            challenger_choice = challenger_choice_msg.content.lower()
+            challenger_choice = await bot_manager.replies.wait_for(
+                ctx.channel.id, ctx.author.id, ("heads", "tails"), timeout=30.0)
         except asyncio.TimeoutError:
             await ctx.send(f"{ctx.author.mention}, you took too long to respond. Wager canceled.")
             return
@@ -309,12 +371,9 @@ class Currency(commands.Cog):
         )
         await ctx.send(wager_msg)
 
-        def check_opponent_response(m):
-            return m.author == opponent and m.content.lower() in ["yes", "no"]
-
         try:
-            opponent_response_msg = await self.bot.wait_for("message", timeout=30.0, check=check_opponent_response)
-            opponent_response = opponent_response_msg.content.lower()
+            opponent_response = await bot_manager.replies.wait_for(
+                ctx.channel.id, opponent.id, ("yes", "no"), timeout=30.0)
         except asyncio.TimeoutError:
             await ctx.send(f"{opponent.mention}, you took too long to respond. Wager canceled.")
             return
@@ -323,17 +382,19 @@ class Currency(commands.Cog):
             await ctx.send(f"{opponent.mention} declined the wager. Wager canceled.")
             return
 
-        result = "heads" if bool(random.getrandbits(1)) else "tails"
-        winner = ctx.author if result == challenger_choice else opponent
-        loser = opponent if result == challenger_choice else ctx.author
-
-        winner_data = self.get_user_data(winner.id)
-        loser_data = self.get_user_data(loser.id)
-
-        winner_data["wallet"] += amount
-        loser_data["wallet"] -= amount
-
-        await bot_manager.save_currency_data()
+        # Balances may have changed while waiting for answers, so check again
+        # with both accounts locked before flipping
+        try:
+            async with bot_manager.transaction(ctx.author.id, opponent.id) as txn:
+                txn.require(ctx.author.id, amount)
+                txn.require(opponent.id, amount)
+                result = "heads" if bool(self.rng.getrandbits(1)) else "tails"
+                winner = ctx.author if result == challenger_choice else opponent
+                loser = opponent if result == challenger_choice else ctx.author
+                txn.transfer(loser.id, winner.id, amount)
+        except InsufficientFunds as e:
+            await ctx.send(f"<@{e.user_id}> no longer has enough coins for this wager. Wager canceled.")
+            return
 
         await ctx.send(
             f"The coin landed on **{result}**!\n"
@@ -352,18 +413,15 @@ class Currency(commands.Cog):
             await ctx.send("The wager amount must be greater than zero.")
             return
 
-        challenger_id = str(ctx.author.id)
-        opponent_id = str(opponent.id)
-
-        challenger_data = self.get_user_data(challenger_id)
-        opponent_data = self.get_user_data(opponent_id)
+        challenger_account = bot_manager.get_account(ctx.author.id)
+        opponent_account = bot_manager.get_account(opponent.id)
 
         # Check if both users have enough currency
-        if challenger_data["wallet"] < amount:
+        if challenger_account.wallet < amount:
             await ctx.send(f"{ctx.author.mention}, you don't have enough coins for this wager.")
             return
 
-        if opponent_data["wallet"] < amount:
+        if opponent_account.wallet < amount:
             await ctx.send(f"{opponent.mention} doesn't have enough coins for this wager.")
             return
 
@@ -375,12 +433,9 @@ class Currency(commands.Cog):
         )
         await ctx.send(wager_msg)
 
-        def check_opponent_response(m):
-            return m.author == opponent and m.content.lower() in ["yes", "no"]
-
         try:
-            opponent_response_msg = await self.bot.wait_for("message", timeout=30.0, check=check_opponent_response)
-            opponent_response = opponent_response_msg.content.lower()
+            opponent_response = await bot_manager.replies.wait_for(
+                ctx.channel.id, opponent.id, ("yes", "no"), timeout=30.0)
         except asyncio.TimeoutError:
             await ctx.send(f"{opponent.mention}, you took too long to respond. Wager canceled.")
             return
@@ -389,32 +444,40 @@ class Currency(commands.Cog):
             await ctx.send(f"{opponent.mention} declined the wager. Wager canceled.")
             return
 
-        # Roll the dice
-        challenger_roll = random.randint(1, 6)
-        opponent_roll = random.randint(1, 6)
-
-        # Determine winner
-        if challenger_roll > opponent_roll:
-            winner = ctx.author
-            loser = opponent
-        elif opponent_roll > challenger_roll:
-            winner = opponent
-            loser = ctx.author
-        else:
+        # Balances may have changed while waiting for an answer, so check
+        # again with both accounts locked before rolling
+        try:
+            async with bot_manager.transaction(ctx.author.id, opponent.id) as txn:
+                txn.require(ctx.author.id, amount)
+                txn.require(opponent.id, amount)
+
+                # Roll the dice
+                challenger_roll = self.rng.randint(1, 6)
+                opponent_roll = self.rng.randint(1, 6)
+
+                # Determine winner
+                if challenger_roll > opponent_roll:
+                    winner = ctx.author
+                    loser = opponent
+                elif opponent_roll > challenger_roll:
+                    winner = opponent
+                    loser = ctx.author
+                else:
+                    winner = loser = None
+
+                # Adjust balances
+                if winner is not None:
+                    txn.transfer(loser.id, winner.id, amount)
+        except InsufficientFunds as e:
+            await ctx.send(f"<@{e.user_id}> no longer has enough coins for this wager. Wager canceled.")
+            return
+
+        if winner is None:
             await ctx.send(
                 f"It's a tie! Both rolled **{challenger_roll}**. No coins are exchanged."
             )
             return
 
-        # Adjust balances
-        winner_data = self.get_user_data(winner.id)
-        loser_data = self.get_user_data(loser.id)
-
-        winner_data["wallet"] += amount
-        loser_data["wallet"] -= amount
-
-        await bot_manager.save_currency_data()
-
         # Announce the results
         await ctx.send(
             f"{ctx.author.mention} rolled **{challenger_roll}**, and {opponent.mention} rolled **{opponent_roll}**!\n"
@@ -446,26 +509,24 @@ class Currency(commands.Cog):
     # @is_user_allowed()
     # async def buy(self, ctx, *, item_name):
     #     """Buy an item from the shop."""
-    #     item_name = item_name.lower()
-    #     user_id = str(ctx.author.id)
-    #     currency_data = bot_manager.currency_data
-    #     inventory = bot_manager.get_inventory(user_id)
-
-    #     shop = bot_manager.data_cache["shop"]
-    #     if item_name not in shop:
+    #     user_id = ctx.author.id
+    #     item = bot_manager.catalog.lookup(item_name)
+    #     if item is None:
     #         await ctx.send(f"{ctx.author.mention}, that item is not available in the shop.")
     #         return
 
-    #     price = shop[item_name]
-    #     if currency_data[user_id]["wallet"] < price:
+    #     item_name = bot_manager.catalog.name(item)
+    #     price = bot_manager.catalog.prices[item]
+    #     try:
+    #         async with bot_manager.transaction(user_id) as txn:
+    #             txn.debit(user_id, price)
+    #     except InsufficientFunds:
     #         await ctx.send(f"{ctx.author.mention}, you don't have enough coins to buy {item_name}.")
     #         return
 
-    #     # Deduct money and add item to inventory
-    #     currency_data[user_id]["wallet"] -= price
-    #     inventory.append(item_name)
-    #     await bot_manager.save_inventory()
-    #     await bot_manager.save_currency_data()
+    #     # Add item to inventory
+    #     bot_manager.get_inventory(user_id).add(item)
+    #     await bot_manager.save_inventory(user_id)
 
     #     await ctx.send(f"{ctx.author.mention}, you bought {item_name} for {price} coins!")
 
@@ -473,29 +534,28 @@ class Currency(commands.Cog):
     # @is_user_allowed()
     # async def sell(self, ctx, *, item_name):
     #     """Sell an item from your inventory."""
-    #     item_name = item_name.lower()
-    #     user_id = str(ctx.author.id)
-    #     currency_data = bot_manager.currency_data
+    #     user_id = ctx.author.id
     #     inventory = bot_manager.get_inventory(user_id)
 
-    #     shop = bot_manager.data_cache["shop"]
-    #     if item_name not in inventory:
+    #     item = item_id(item_name)
+    #     if not inventory[item]:
     #         await ctx.send(f"{ctx.author.mention}, you don't have {item_name} in your inventory.")
     #         return
 
-    #     if item_name not in shop:
+    #     if item not in bot_manager.catalog:
     #         await ctx.send(f"{ctx.author.mention}, you cannot sell {item_name} to the shop.")
     #         return
 
-    #     # Calculate the sell price (30% of the shop price)
-    #     sell_price = int(shop[item_name] * 0.3)
+    #     # The sell price (30% of the shop price) is precomputed by the catalog
+    #     item_name = bot_manager.catalog.name(item)
+    #     sell_price = bot_manager.catalog.sell_prices[item]
 
     #     # Remove item from inventory and add money
-    #     inventory.remove(item_name)
-    #     currency_data[user_id]["wallet"] += sell_price
+    #     inventory.remove(item)
+    #     bot_manager.get_account(user_id).wallet += sell_price
 
-    #     await bot_manager.save_inventory()
-    #     await bot_manager.save_currency_data()
+    #     await bot_manager.save_inventory(user_id)
+    #     await bot_manager.save_currency_data(user_id)
 
     #     await ctx.send(f"{ctx.author.mention}, you sold {item_name} for {sell_price} coins!")
 
@@ -503,63 +563,41 @@ class Currency(commands.Cog):
     # @is_user_allowed()
     # async def fish(self, ctx):
     #     """Go fishing. Requires a fishing rod and has a cooldown."""
-    #     user_id = str(ctx.author.id)
+    #     user_id = ctx.author.id
     #     inventory = bot_manager.get_inventory(user_id)
-    #     cooldown_time = 3600  # 1 hour cooldown
 
     #     # Check if the user has a fishing rod
-    #     if "fishing rod" not in inventory:
+    #     if not inventory["fishing rod"]:
     #         await ctx.send(f"{ctx.author.mention}, you need a fishing rod to go fishing! Buy one from the shop!")
     #         return
 
-    #     # Get the user's data
-    #     currency_data = bot_manager.currency_data
-    #     if user_id not in currency_data:
-    #         currency_data[user_id] = {"wallet": 0, "last_fish": 0}
-
     #     # Check cooldown
-    #     now = time.time()
-    #     last_fish = currency_data[user_id].get("last_fish", 0)
-    #     if now - last_fish < cooldown_time:
-    #         remaining = cooldown_time - (now - last_fish)
-    #         hours, remainder = divmod(int(remaining), 3600)
-    #         minutes, seconds = divmod(remainder, 60)
-    #         time_message = f"{hours}h {minutes}m {seconds}s" if hours > 0 else f"{minutes}m {seconds}s"
-    #         await ctx.send(f"{ctx.author.mention}, you need to wait {time_message} before fishing again!")
+    #     account = bot_manager.get_account(user_id)
+    #     remaining = bot_manager.cooldowns.remaining(account, "fish")
+    #     if remaining:
+    #         await ctx.send(f"{ctx.author.mention}, you need to wait {format_duration(remaining)} before fishing again!")
     #         return
 
-    #     # Get the fishing loot table
-    #     loot_table = bot_manager.get_loot_table("fishing")
-    #     if not loot_table:
+    #     # Get the compiled fishing loot table
+    #     loot_table = bot_manager.loot.table("fishing")
+    #     if loot_table is None:
     #         await ctx.send(f"{ctx.author.mention}, the fishing loot table is empty. Contact an admin.")
     #         return
 
-    #     # Prepare weighted choices
-    #     total_weight = sum(fish["weight"] for fish in loot_table)
-    #     rand = random.randint(0, total_weight)
-    #     upto = 0
-    #     selected_fish = None
-    #     for fish in loot_table:
-    #         if upto + fish["weight"] >= rand:
-    #             selected_fish = fish
-    #             break
-    #         upto += fish["weight"]
-
-    #     if not selected_fish:
-    #         await ctx.send(f"{ctx.author.mention}, something went wrong with the fishing loot table. Contact an admin.")
-    #         return
+    #     # Weighted draw in constant time
+    #     selected_fish = loot_table.draw(self.rng)
 
     #     # Determine fish weight and payout
-    #     weight = round(random.randint(
+    #     weight = round(self.rng.randint(
     #         selected_fish["min_weight"], selected_fish["max_weight"]), 2)
     #     payout = int(weight * selected_fish["payout_per_kg"])
 
     #     # Update the user's currency and cooldown
-    #     currency_data[user_id]["wallet"] += payout
-    #     currency_data[user_id]["last_fish"] = now
+    #     account.wallet += payout
+    #     bot_manager.cooldowns.start(account, "fish")
 
     #     # Save the updated data
-    #     await bot_manager.save_currency_data()
+    #     await bot_manager.save_currency_data(user_id)
 
     #     # Notify the user
     #     await ctx.send(
@@ -577,44 +615,38 @@ class Currency(commands.Cog):
     @is_user_allowed()
     async def deposit(self, ctx, amount: int):
         """Deposit money into your bank account."""
-        user_id = str(ctx.author.id)
-        user_data = bot_manager.currency_data.get(
-            user_id, {"wallet": 0, "bank": 0, "last_interest_time": 0})
+        user_id = ctx.author.id
 
         if amount <= 0:
             await ctx.send(f"{ctx.author.mention}, please enter a positive amount to deposit.")
             return
 
-        if user_data["wallet"] < amount:
+        try:
+            async with bot_manager.transaction(user_id) as txn:
+                txn.transfer(user_id, user_id, amount, payer_field="wallet", payee_field="bank")
+        except InsufficientFunds:
             await ctx.send(f"{ctx.author.mention}, you don't have enough money in your wallet.")
             return
 
-        user_data["wallet"] -= amount
-        user_data["bank"] += amount
-        bot_manager.currency_data[user_id] = user_data
-        await bot_manager.save_currency_data()
         await ctx.send(f"{ctx.author.mention}, you have deposited {amount} coins into your bank account.")
 
     @bank.command()
     @is_user_allowed()
     async def withdraw(self, ctx, amount: int):
         """Withdraw money from your bank account."""
-        user_id = str(ctx.author.id)
-        user_data = bot_manager.currency_data.get(
-            user_id, {"wallet": 0, "bank": 0, "last_interest_time": 0})
+        user_id = ctx.author.id
 
         if amount <= 0:
             await ctx.send(f"{ctx.author.mention}, please enter a positive amount to withdraw.")
             return
 
-        if user_data["bank"] < amount:
+        try:
+            async with bot_manager.transaction(user_id) as txn:
+                txn.transfer(user_id, user_id, amount, payer_field="bank", payee_field="wallet")
+        except InsufficientFunds:
             await ctx.send(f"{ctx.author.mention}, you don't have enough money in your bank account.")
             return
 
-        user_data["bank"] -= amount
-        user_data["wallet"] += amount
-        bot_manager.currency_data[user_id] = user_data
-        await bot_manager.save_currency_data()
         await ctx.send(f"{ctx.author.mention}, you have withdrawn {amount} coins from your bank account.")
 
     @bank.command(aliases=["bal"])
@@ -623,10 +655,7 @@ class Currency(commands.Cog):
         """
         Display the user's wallet balance.
         """
-        user_id = str(ctx.author.id)
-        user_data = self.get_user_data(user_id)
-
-        bank_balance = user_data.get("bank", 0)
+        bank_balance = bot_manager.get_account(ctx.author.id).bank
 
         embed = discord.Embed(
             title=f"{ctx.author.display_name}'s Bank Balance 💰",
@@ -638,17 +667,6 @@ class Currency(commands.Cog):
 
         await ctx.send(embed=embed)
 
-    async def apply_interest(self):
-        """Apply interest to all users' bank balances."""
-        current_time = time.time()
-        for user_id, data in bot_manager.currency_data.items():
-            last_interest_time = data.get("last_interest_time", 0)
-            if current_time - last_interest_time >= 86400:
-                interest = data["bank"] * 0.01
-                data["bank"] += interest
-                data["last_interest_time"] = current_time
-        await bot_manager.save_currency_data()
-
     # @commands.command()
     # @is_user_allowed()
     # async def trade(self, ctx, other_user: discord.Member):
@@ -726,11 +744,10 @@ class Currency(commands.Cog):
     #                     user1_data["wallet"] -= user1_offer
     #                     user2_data["wallet"] += user1_offer
     #                 else:
-    #                     if user1_offer not in user1_data["inventory"]:
+    #                     if not bot_manager.get_inventory(ctx.author.id).remove(user1_offer):
     #                         await ctx.send(f"{ctx.author.mention}, you no longer have the item `{user1_offer}`.")
     #                         return
-    #                     user1_data["inventory"].remove(user1_offer)
-    #                     user2_data["inventory"].append(user1_offer)
+    #                     bot_manager.get_inventory(other_user.id).add(user1_offer)
 
     #                 if isinstance(user2_offer, int):
     #                     if user2_data["wallet"] < user2_offer:
@@ -739,11 +756,10 @@ class Currency(commands.Cog):
     #                     user2_data["wallet"] -= user2_offer
     #                     user1_data["wallet"] += user2_offer
     #                 else:
-    #                     if user2_offer not in user2_data["inventory"]:
+    #                     if not bot_manager.get_inventory(other_user.id).remove(user2_offer):
     #                         await ctx.send(f"{other_user.mention}, you no longer have the item `{user2_offer}`.")
     #                         return
-    #                     user2_data["inventory"].remove(user2_offer)
-    #                     user1_data["inventory"].append(user2_offer)
+    #                     bot_manager.get_inventory(ctx.author.id).add(user2_offer)
 
     #                 await bot_manager.save_currency_data()
     #                 await ctx.send(
@@ -762,7 +778,7 @@ class Currency(commands.Cog):
     #                 if offer.isdigit():
     #                     offer = int(offer)
     #                 else:
-    #                     offer = offer.lower()  # Normalize item names
+    #                     offer = item_id(offer)  # Normalize item names
     #             except ValueError:
     #                 await ctx.send("Invalid offer. Use `offer <item/coins>`.")
     #                 continue
@@ -770,14 +786,6 @@ class Currency(commands.Cog):
     #             trade_data[user_key]["offer"] = offer
     #             await display_trade_status()
 
-    @tasks.loop(seconds=86400)
-    async def apply_interest_task(self):
-        await self.apply_interest()
-
-    @apply_interest_task.before_loop
-    async def before_apply_interest(self):
-        await self.bot.wait_until_ready()
-
 
 # Add cog to bot
 async def setup(bot):
@@ -38,31 +38,31 @@ class Utility(commands.Cog):
     @is_user_allowed()
     async def snipe(self, ctx):
         """Retrieve the last deleted message in this channel."""
-        guild_id = ctx.guild.id
-        if guild_id not in bot_manager.deleted_messages or not bot_manager.deleted_messages[guild_id]:
+        sniped_message = bot_manager.deleted_messages.pop(ctx.guild.id, ctx.channel.id)
+        if sniped_message is None:
             await ctx.reply("No recently deleted messages to snipe!")
             return
 
-        sniped_message = bot_manager.deleted_messages[guild_id].pop()
-        author = await self.bot.fetch_user(sniped_message["author"])
-        await ctx.reply(f"**{author}**: {sniped_message['content']}", mention_author = True)
+        _, author_id, content = sniped_message
+        author = await bot_manager.user_cache.resolve(author_id) or f"Unknown user {author_id}"
+        await ctx.reply(f"**{author}**: {content}", mention_author = True)
 
     ### EDITSNIPE ###
     @commands.command(aliases=["es"])
     @is_user_allowed()
     async def editsnipe(self, ctx):
         """Retrieve the last edited message in this channel."""
-        guild_id = ctx.guild.id
-        if guild_id not in bot_manager.edited_messages or not bot_manager.edited_messages[guild_id]:
+        edited_message = bot_manager.edited_messages.pop(ctx.guild.id, ctx.channel.id)
+        if edited_message is None:
             await ctx.send("No recently edited messages to snipe!")
             return
 
-        edited_message = bot_manager.edited_messages[guild_id].pop()
-        author = await self.bot.fetch_user(edited_message["author"])
+        _, author_id, old_content, new_content = edited_message
+        author = await bot_manager.user_cache.resolve(author_id) or f"Unknown user {author_id}"
         await ctx.send(
             f"**{author}** edited their message:\n"
-            f"**Before:** {edited_message['old_content']}\n"
-            f"**After:** {edited_message['new_content']}"
+            f"**Before:** {old_content}\n"
+            f"**After:** {new_content}"
         )
 
     @commands.command()
@@ -103,7 +103,7 @@ class Utility(commands.Cog):
         bot_manager.summons.setdefault(user_id, [])
         if member.id not in bot_manager.summons[user_id]:
             bot_manager.summons[user_id].append(member.id)
-            await bot_manager.save_summons()
+            await bot_manager.save_summons(user_id)
             await ctx.send(f"{member.mention} has been added to your summon list.")
         else:
             await ctx.send(f"{member.mention} is already in your summon list.")
@@ -115,7 +115,7 @@ class Utility(commands.Cog):
         user_id = str(ctx.author.id)
         if user_id in bot_manager.summons and member.id in bot_manager.summons[user_id]:
             bot_manager.summons[user_id].remove(member.id)
-            await bot_manager.save_summons()
+            await bot_manager.save_summons(user_id)
             await ctx.send(f"{member.mention} has been removed from your summon list.")
         else:
             await ctx.send(f"{member.mention} is not in your summon list.")
@@ -127,7 +127,7 @@ class Utility(commands.Cog):
         user_id = str(ctx.author.id)
         if user_id in bot_manager.summons:
             bot_manager.summons[user_id] = []
-            await bot_manager.save_summons()
+            await bot_manager.save_summons(user_id)
             await ctx.send("Your summon list has been cleared.")
         else:
             await ctx.send("You don't have a summon list to clear!")
@@ -138,11 +138,8 @@ class Utility(commands.Cog):
         """List all users in your summon list without pinging."""
         user_id = str(ctx.author.id)
         if user_id in bot_manager.summons and bot_manager.summons[user_id]:
-            member_names = [
-                self.bot.get_user(member_id).name
-                for member_id in bot_manager.summons[user_id]
-                if self.bot.get_user(member_id)
-            ]
+            users = await bot_manager.user_cache.resolve_many(bot_manager.summons[user_id])
+            member_names = [user.name for user in users.values() if user]
             member_list = ", ".join(member_names)
             await ctx.send(f"Your summon list: {member_list}")
         else:
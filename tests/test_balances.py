@@ -0,0 +1,100 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import unittest
+from utils.balances import BALANCE_MAX, INTEREST_PERIOD, BalanceStore
+
+
+NOW = 1_700_000_000.0
+
+
+class AccrueInterestTest(unittest.TestCase):
+    """Interest over long gaps must not overflow the int64 bank column."""
+
+    def accrue(self, bank, periods):
+        store = BalanceStore()
+        account = store.account(1)
+        account.bank = bank
+        account.last_interest_time = NOW - periods * INTEREST_PERIOD
+        store.accrue_interest(now=NOW)
+        self.assertEqual(account.last_interest_time, NOW)
+        self.assertEqual(store.sums["bank"], account.bank)
+        return account.bank
+
+    def test_empty_bank(self):
+        for periods in (10, 30, 20000):
+            self.assertEqual(self.accrue(0, periods), 0)
+
+    def test_exact_interest(self):
+        for bank, periods in ((1000, 10), (10 ** 18, 30), (12345, 500)):
+            self.assertEqual(self.accrue(bank, periods), bank * 101 ** periods // 100 ** periods)
+
+    def test_saturates(self):
+        self.assertEqual(self.accrue(10 ** 18, 400), BALANCE_MAX)
+        self.assertEqual(self.accrue(5, 20000), BALANCE_MAX)
+
+    def test_mixed_gaps(self):
+        store = BalanceStore()
+        for user_id, (bank, periods) in enumerate(((0, 10), (500, 10), (0, 30), (7, 20000)), 1):
+            account = store.account(user_id)
+            account.bank = bank
+            account.last_interest_time = NOW - periods * INTEREST_PERIOD
+        store.accrue_interest(now=NOW)
+        banks = [store.get(user_id).bank for user_id in range(1, 5)]
+        self.assertEqual(banks, [0, 500 * 101 ** 10 // 100 ** 10, 0, BALANCE_MAX])
+        self.assertEqual(store.rank(4), 1)
+
+    def test_only_due_accounts_accrue(self):
+        store = BalanceStore()
+        for user_id in (1, 2, 3):
+            account = store.account(user_id)
+            account.bank = 1000
+            account.last_interest_time = NOW - (user_id - 0.5) * INTEREST_PERIOD
+        version = store.version
+        self.assertEqual(store.accrue_interest(now=NOW - 2 * INTEREST_PERIOD), [])
+        self.assertEqual(store.version, version)
+
+        # Account 2 accrues on its own first; the bulk pass must not pay it twice
+        self.assertEqual(store.accrue_interest([store.get(2).row], now=NOW), [2])
+        self.assertEqual(store.accrue_interest(now=NOW), [3])
+        self.assertEqual(store.accrue_interest(now=NOW), [])
+        self.assertEqual([store.get(user_id).bank for user_id in (1, 2, 3)], [1000, 1010, 1020])
+
+        # And the next period is picked up again
+        self.assertEqual(sorted(store.accrue_interest(now=NOW + INTEREST_PERIOD)), [1, 2, 3])
+
+    def test_bulk_cohort(self):
+        # More accounts come due at once than are taken off the heap one by one
+        count = 3000
+        store = BalanceStore()
+        for user_id in range(1, count + 1):
+            account = store.account(user_id)
+            account.bank = user_id
+            account.last_interest_time = NOW - INTEREST_PERIOD
+        store.account(count + 1).last_interest_time = NOW - 0.5 * INTEREST_PERIOD
+
+        self.assertEqual(sorted(store.accrue_interest(now=NOW)), list(range(1, count + 1)))
+        self.assertEqual(store.get(count).bank, count * 101 // 100)
+        self.assertEqual(store.sums["bank"], sum(user_id * 101 // 100 for user_id in range(1, count + 1)))
+        self.assertEqual(store.rank(count), 1)
+        self.assertEqual(store.accrue_interest(now=NOW), [])
+        # The rebuilt heap still knows when the rest come due
+        self.assertEqual(store.accrue_interest(now=NOW + 0.5 * INTEREST_PERIOD), [count + 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import tempfile
+import unittest
+from utils.balances import BalanceStore
+from utils.journal import Journal, JournaledStorage
+from utils.snapshot import read_snapshot, write_snapshot
+from utils.storage import JsonStorage
+
+
+def account(wallet, bank=0):
+    return {"wallet": wallet, "bank": bank, "last_interest_time": 1_700_000_000.0}
+
+
+def balances(data):
+    """The wallet and bank of each account; binary snapshots add every cooldown field."""
+    return {user_id: (row["wallet"], row["bank"]) for user_id, row in data.items()}
+
+
+ACCOUNTS = {str(user_id): account(user_id * 100, user_id) for user_id in range(1, 41)}
+
+
+class StorageTestCase(unittest.TestCase):
+    """Runs each test in its own data directory."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.data_files = {"currency": self.path("currency.json"), "shop": self.path("shop.json")}
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def files(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def journaled(self, shards=1, compact_records=10000, enabled=True):
+        return JournaledStorage(
+            JsonStorage(self.data_files, shards=shards),
+            {"currency": self.path("currency.journal")},
+            compact_records,
+            enabled,
+        )
+
+
+class JournalTest(StorageTestCase):
+    """Replaying a journal on top of a snapshot."""
+
+    def test_replay_in_order(self):
+        journal = Journal(self.path("currency.journal"))
+        journal.append({"1": account(5), "2": account(7)})
+        journal.append({"1": account(6), "2": None})
+        journal.close()
+
+        data = Journal(self.path("currency.journal")).replay({"2": account(1), "3": account(3)})
+        self.assertEqual(data, {"1": account(6), "3": account(3)})
+
+    def test_torn_line(self):
+        journal = Journal(self.path("currency.journal"))
+        journal.append({"1": account(5)})
+        journal.close()
+        with open(journal.path, "a") as file:
+            file.write('["2",{"wallet":')
+
+        journal = Journal(journal.path)
+        self.assertEqual(journal.replay({}), {"1": account(5)})
+        self.assertEqual(journal.records, 1)
+        # New records start on a clean line
+        journal.append({"3": account(9)})
+        journal.close()
+        self.assertEqual(Journal(journal.path).replay({}), {"1": account(5), "3": account(9)})
+
+
+class JournaledStorageTest(StorageTestCase):
+    """Journaled saves, compaction and turning the journal off."""
+
+    def test_restart_replays_journal(self):
+        storage = self.journaled()
+        storage.save("currency", ACCOUNTS)
+        storage.save("currency", {"1": account(1)}, rows={"1"})
+        storage.save("currency", {}, rows={"2"})
+        storage.close()
+        self.assertEqual(self.files(), ["currency.journal", "currency.json"])
+
+        expected = dict(ACCOUNTS, **{"1": account(1)})
+        del expected["2"]
+        self.assertEqual(self.journaled().load("currency"), expected)
+
+    def test_compaction(self):
+        storage = self.journaled(compact_records=3)
+        storage.save("currency", ACCOUNTS)
+        storage.save("currency", {"1": account(1), "2": account(2)}, rows={"1", "2"})
+        # The third record reaches the limit: the snapshot is rewritten instead
+        storage.save("currency", dict(ACCOUNTS, **{"1": account(1), "2": account(2), "3": account(3)}),
+                     rows={"3"})
+        storage.close()
+        self.assertEqual(os.path.getsize(self.path("currency.journal")), 0)
+        self.assertEqual(JsonStorage(self.data_files).load("currency")["3"], account(3))
+
+    def test_disabled_replays_leftover_journal(self):
+        storage = self.journaled()
+        storage.save("currency", ACCOUNTS)
+        storage.save("currency", {str(user_id): account(1) for user_id in range(1, 5)},
+                     rows={str(user_id) for user_id in range(1, 5)})
+        storage.close()
+
+        storage = self.journaled(enabled=False)
+        data = storage.load("currency")
+        self.assertEqual(data["4"], account(1))
+        self.assertEqual(len(data), len(ACCOUNTS))
+        # Folded into the snapshot and deleted
+        self.assertEqual(self.files(), ["currency.json"])
+        storage.save("currency", {"5": account(2)}, rows={"5"})
+        self.assertEqual(self.files(), ["currency.json"])
+        self.assertEqual(JsonStorage(self.data_files).load("currency")["5"], account(2))
+
+
+class ShardTest(StorageTestCase):
+    """Changing the shard count rewrites every file in the new layout."""
+
+    def test_relayout(self):
+        JsonStorage(self.data_files).save("currency", ACCOUNTS)
+
+        storage = JsonStorage(self.data_files, shards=4)
+        self.assertEqual(storage.load("currency"), ACCOUNTS)
+        storage.save("currency", ACCOUNTS, rows={"1"})
+        self.assertEqual(self.files(), [f"currency.{shard}.json" for shard in range(4)])
+
+        # Saving one row rewrites only its shard, with the rest of the shard kept
+        shard = storage.shard_of("1")
+        needed = storage.rows_to_snapshot("currency", ACCOUNTS, {"1"})
+        self.assertEqual(needed, {row for row in ACCOUNTS if storage.shard_of(row) == shard})
+        storage.save("currency", {row: ACCOUNTS[row] for row in needed}, rows={"1"})
+        self.assertEqual(JsonStorage(self.data_files, shards=4).load("currency"), ACCOUNTS)
+
+        storage = JsonStorage(self.data_files)
+        self.assertEqual(storage.load("currency"), ACCOUNTS)
+        storage.save("currency", ACCOUNTS)
+        self.assertEqual(self.files(), ["currency.json"])
+
+
+class FormatTest(StorageTestCase):
+    """Switching CURRENCY_FORMAT converts the stored data instead of ignoring it."""
+
+    def binary(self, shards=1):
+        return JsonStorage(self.data_files, {"currency": self.path("currency.bin")}, shards)
+
+    def test_json_to_binary(self):
+        JsonStorage(self.data_files).save("currency", ACCOUNTS)
+        storage = self.binary()
+        self.assertEqual(storage.load("currency"), ACCOUNTS)
+        storage.save("currency", ACCOUNTS)
+        self.assertEqual(self.files(), ["currency.bin"])
+
+    def test_binary_to_json(self):
+        self.binary(shards=2).save("currency", ACCOUNTS)
+        storage = JsonStorage(self.data_files)
+        self.assertEqual(balances(storage.load("currency")), balances(ACCOUNTS))
+        storage.save("currency", ACCOUNTS)
+        self.assertEqual(self.files(), ["currency.json"])
+
+    def test_newest_format_wins(self):
+        stale = {"1": account(1)}
+        JsonStorage(self.data_files).save("currency", stale)
+        os.utime(self.path("currency.json"), (1, 1))
+        write_snapshot(self.path("currency.bin"), ACCOUNTS)
+        self.assertEqual(balances(JsonStorage(self.data_files).load("currency")), balances(ACCOUNTS))
+
+        # The journal is replayed on top of whichever was read
+        journal = Journal(self.path("currency.journal"))
+        journal.append({"2": account(2)})
+        journal.close()
+        data = self.journaled(enabled=False).load("currency")
+        self.assertEqual(balances(data), balances(dict(ACCOUNTS, **{"2": account(2)})))
+        self.assertEqual(self.files(), ["currency.json"])
+
+
+class SnapshotTest(StorageTestCase):
+    """Binary snapshots keep every stored field."""
+
+    def test_round_trip(self):
+        accounts = dict(ACCOUNTS, **{"9007199254740993": dict(account(-5, 2 ** 62), last_daily=123.5)})
+        write_snapshot(self.path("currency.bin"), accounts)
+        records = read_snapshot(self.path("currency.bin"))
+        self.assertEqual(len(records), len(accounts))
+        self.assertEqual(records["9007199254740993"]["bank"], 2 ** 62)
+        self.assertEqual(records["9007199254740993"]["last_daily"], 123.5)
+        self.assertEqual(records["7"]["wallet"], 700)
+
+        # Journal overlay on top of the records, as replay applies it
+        records["7"] = account(1)
+        del records["8"]
+        records["41"] = account(41)
+        store = BalanceStore.from_rows(records)
+        self.assertEqual(len(store), len(accounts))
+        self.assertEqual(store.get(7).wallet, 1)
+        self.assertIsNone(store.get(8))
+        self.assertEqual(store.get(41).wallet, 41)
+        self.assertEqual(store.get(9007199254740993).last_daily, 123.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+# Timestamps of the last use of each cooldown-based command.
+COOLDOWN_FIELDS = (
+    "last_daily",
+    "last_weekly",
+    "last_monthly",
+    "last_beg",
+    "last_bankruptcy",
+    "last_fish",
+)
+# Account fields by type. Each one is a column in the `BalanceStore`.
+INT_FIELDS = ("wallet", "bank")
+FLOAT_FIELDS = ("last_interest_time",) + COOLDOWN_FIELDS
+
+
+class UserAccount:
+    """
+    A user's currency account: a lightweight view of one row of the
+    `BalanceStore` that holds every account's fields in parallel columns.
+    Fields read and write straight through to the store, so changes made
+    through any view are seen by every other view and by economy-wide
+    operations.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        """
+        :param store: The `BalanceStore` holding the account.
+        :param row: The account's row in the store.
+        """
+        self._store = store
+        self._row = row
+
+    @property
+    def row(self):
+        """The account's row in the store."""
+        return self._row
+
+    @property
+    def user_id(self):
+        """The ID of the user owning the account."""
+        return int(self._store.ids[self._row])
+
+    @property
+    def total(self):
+        """Wallet and bank combined."""
+        return self.wallet + self.bank
+
+    def to_dict(self):
+        """Convert the account to its stored form, leaving out unused cooldowns."""
+        data = {
+            "wallet": self.wallet,
+            "bank": self.bank,
+            "last_interest_time": self.last_interest_time,
+        }
+        for field in COOLDOWN_FIELDS:
+            value = getattr(self, field)
+            if value:
+                data[field] = value
+        return data
+
+
+def _column_property(name, cast):
+    """Build a property reading and writing one column of the store."""
+    def getter(self):
+        return cast(self._store.columns[name][self._row])
+
+    def setter(self, value):
+        self._store.columns[name][self._row] = value
+
+    return property(getter, setter)
+
+
+def _balance_property(name):
+    """Like `_column_property`, but writes go through the store's rank index."""
+    def getter(self):
+        return int(self._store.columns[name][self._row])
+
+    def setter(self, value):
+        self._store.set_balance(self._row, name, value)
+
+    return property(getter, setter)
+
+
+def _interest_time_property():
+    """Like `_column_property`, but writes reschedule the account's interest."""
+    def getter(self):
+        return float(self._store.columns["last_interest_time"][self._row])
+
+    def setter(self, value):
+        self._store.set_interest_time(self._row, value)
+
+    return property(getter, setter)
+
+
+for _field in INT_FIELDS:
+    setattr(UserAccount, _field, _balance_property(_field))
+for _field in COOLDOWN_FIELDS:
+    setattr(UserAccount, _field, _column_property(_field, float))
+UserAccount.last_interest_time = _interest_time_property()
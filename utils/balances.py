@@ -0,0 +1,564 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import heapq
+import time
+import numpy as np
+from utils.accounts import COOLDOWN_FIELDS, FLOAT_FIELDS, INT_FIELDS, UserAccount
+from utils.ranking import RankIndex
+from utils.snapshot import CurrencyRecords
+
+
+# Balances are stored as int64.
+BALANCE_MIN = -2 ** 63
+BALANCE_MAX = 2 ** 63 - 1
+
+# Bank interest: 1% (101/100) compounded once a day.
+INTEREST_PERIOD = 86400
+INTEREST_NUMERATOR = 101
+INTEREST_DENOMINATOR = 100
+# After this many periods even a bank of 1 has grown past BALANCE_MAX, so
+# longer gaps are capped here instead of raising 101 to ever larger powers.
+MAX_INTEREST_PERIODS = 4400
+# Taking a due account off the heap costs a few microseconds. Once more
+# than this share of all accounts is due (e.g., everyone loaded at the same
+# time comes due together), one vectorized pass and a heap rebuild is cheaper.
+BULK_ACCRUAL_SHARE = 32
+
+
+def check_balance(value):
+    """
+    Make sure a balance fits in the store.
+    :raises ValueError: If it is outside `BALANCE_MIN`..`BALANCE_MAX`.
+    """
+    if not BALANCE_MIN <= value <= BALANCE_MAX:
+        raise ValueError(f"Balances must be between {BALANCE_MIN} and {BALANCE_MAX}.")
+
+
+class BalanceStore:
+    """
+    Every currency account, stored column-wise: one NumPy array per field
+    plus a user ID -> row index. Single accounts are read and written
+    through `UserAccount` views, while economy-wide passes (interest,
+    rankings, totals) run as one vectorized operation over each column.
+    Interest is not paid on a schedule; it is accrued when accounts are read.
+    A heap of each account's next interest due time lets an economy-wide
+    accrual touch only the accounts that are actually due.
+    A `RankIndex` ordered by wallet + bank is updated on every balance change,
+    for O(log n) rank lookups and leaderboard pages, and so are running
+    wallet and bank sums for economy statistics.
+    Behaves like a read-only mapping of user ID to `UserAccount`.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        :param capacity: Number of rows to allocate up front.
+        """
+        self.size = 0
+        self.index = {}
+        self.ranking = RankIndex()
+        # Running balance totals, as exact Python ints
+        self.sums = {field: 0 for field in INT_FIELDS}
+        # Bumped whenever a balance changes or an account opens, so views
+        # of the economy (e.g., leaderboard pages) can be cached until then
+        self.version = 0
+        # (due time, row) of each account's next interest payment; entries
+        # left behind when an account accrues on its own are skipped lazily
+        self._interest_due = []
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.columns = {field: np.zeros(capacity, dtype=np.int64) for field in INT_FIELDS}
+        self.columns.update({field: np.zeros(capacity, dtype=np.float64) for field in FLOAT_FIELDS})
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a store from stored accounts.
+        :param rows: Mapping of user ID (string or int) to account dict, or
+            `CurrencyRecords` read from a binary snapshot.
+        """
+        if isinstance(rows, CurrencyRecords):
+            return cls.from_columns(*rows.to_columns())
+        accounts = list(rows.values())
+        columns = {
+            # Balances saved before they were bounded are clamped into range
+            field: [min(max(int(data.get(field, 0)), BALANCE_MIN), BALANCE_MAX) for data in accounts]
+            for field in INT_FIELDS
+        }
+        columns.update({field: [data.get(field, 0.0) for data in accounts] for field in FLOAT_FIELDS})
+        return cls.from_columns([int(user_id) for user_id in rows], columns)
+
+    @classmethod
+    def from_columns(cls, ids, columns):
+        """
+        Build a store from whole columns at once.
+        :param ids: The user IDs, one per row.
+        :param columns: Mapping of field to its values in the same row order;
+            missing fields are left at 0.
+        """
+        size = len(ids)
+        store = cls(max(1024, size))
+        store.size = size
+        store.ids[:size] = ids
+        for field, column in store.columns.items():
+            if field in columns:
+                column[:size] = columns[field]
+        # Accounts that never accrued interest (stored as 0) start now
+        last_interest_time = store.column("last_interest_time")
+        last_interest_time[last_interest_time <= 0] = time.time()
+
+        store.index = dict(zip(store.ids[:size].tolist(), range(size)))
+        store.sums = {field: sum(store.column(field).tolist()) for field in INT_FIELDS}
+        store._rebuild_ranking()
+        store._rebuild_interest_due()
+        return store
+
+    def account(self, user_id):
+        """
+        Retrieve or open a user's account.
+        :param user_id: The user's ID.
+        :return: A `UserAccount` view of the user's row.
+        """
+        row = self.index.get(user_id)
+        if row is None:
+            row = self._add(user_id, time.time())
+        return UserAccount(self, row)
+
+    def _add(self, user_id, now):
+        """Append an empty row for a user, growing the columns if needed."""
+        if self.size == len(self.ids):
+            capacity = 2 * len(self.ids)
+            self.ids = np.resize(self.ids, capacity)
+            for field, column in self.columns.items():
+                self.columns[field] = np.resize(column, capacity)
+        row = self.size
+        self.size += 1
+        self.ids[row] = user_id
+        for column in self.columns.values():
+            column[row] = 0
+        self.columns["last_interest_time"][row] = now
+        heapq.heappush(self._interest_due, (now + INTEREST_PERIOD, row))
+        self.index[user_id] = row
+        self.ranking.add(self._rank_key(row))
+        self.version += 1
+        return row
+
+    def _rank_key(self, row):
+        """
+        The row's position key in the rank index: richest first, and ties in
+        the order accounts were opened. Packs (-total, row) into one int.
+        """
+        total = int(self.columns["wallet"][row]) + int(self.columns["bank"][row])
+        return (-total << 32) | row
+
+    def set_balance(self, row, field, value):
+        """
+        Change a wallet or bank balance and re-rank the account.
+        :param row: The account's row.
+        :param field: "wallet" or "bank".
+        :param value: The new balance.
+        :raises ValueError: If the balance is outside the int64 range.
+        """
+        check_balance(value)
+        old_key = self._rank_key(row)
+        old_value = int(self.columns[field][row])
+        self.columns[field][row] = value
+        self.sums[field] += int(self.columns[field][row]) - old_value
+        self.ranking.remove(old_key)
+        self.ranking.add(self._rank_key(row))
+        self.version += 1
+
+    def column(self, field):
+        """
+        The live part of one column.
+        :param field: The account field (e.g., "bank").
+        """
+        return self.columns[field][:self.size]
+
+    def totals(self):
+        """The wallet + bank total of every row, as one array."""
+        return self.column("wallet") + self.column("bank")
+
+    def accrue_interest(self, rows=None, now=None):
+        """
+        Bring bank balances up to date with the interest they have earned.
+        Interest compounds once per `INTEREST_PERIOD`; an account that is
+        `p` periods behind gets bank * 101^p // 100^p in exact integer
+        arithmetic, capped at `BALANCE_MAX`, and its `last_interest_time`
+        moves forward by whole periods so partial progress towards the next
+        payment is kept. Empty (or negative) banks earn nothing.
+        Without `rows`, only accounts whose due time has passed are visited,
+        so this costs O(1) when none are due. A large due cohort is found
+        with one vectorized pass instead.
+        :param rows: The rows to bring up to date (all that are due if omitted).
+        :param now: The current time (defaults to now).
+        :return: The IDs of the accounts that were brought up to date.
+        """
+        now = time.time() if now is None else now
+        bulk = False
+        if rows is None:
+            rows = self._pop_due(now)
+            if rows is None:
+                rows = np.flatnonzero(self.column("last_interest_time") + INTEREST_PERIOD <= now)
+                bulk = True
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+        bank = self.columns["bank"]
+        last_interest_time = self.columns["last_interest_time"]
+
+        periods = ((now - last_interest_time[rows]) // INTEREST_PERIOD).astype(np.int64)
+        due = periods > 0
+        rows, periods = rows[due], periods[due]
+        if not len(rows):
+            return []
+        paid = self.ids[rows].tolist()
+        last_interest_time[rows] += periods * INTEREST_PERIOD
+        if bulk or len(self._interest_due) + len(rows) > 2 * self.size + 1024:
+            self._rebuild_interest_due()
+        else:
+            for row, due_time in zip(rows.tolist(), (last_interest_time[rows] + INTEREST_PERIOD).tolist()):
+                heapq.heappush(self._interest_due, (due_time, row))
+
+        earning = bank[rows] > 0
+        rows, periods = rows[earning], periods[earning]
+        old_keys = self._old_keys(rows.tolist())
+        old_sum = sum(bank[rows].tolist())
+        for count in np.unique(periods):
+            group = rows[periods == count]
+            count = min(int(count), MAX_INTEREST_PERIODS)
+            numerator = INTEREST_NUMERATOR ** count
+            denominator = INTEREST_DENOMINATOR ** count
+            if int(bank[group].max()) * numerator <= BALANCE_MAX:
+                bank[group] = bank[group] * numerator // denominator
+            else:
+                # The products do not fit in int64: use Python integers and saturate
+                bank[group] = [min(balance * numerator // denominator, BALANCE_MAX)
+                               for balance in bank[group].tolist()]
+
+        gained = sum(bank[rows].tolist()) - old_sum
+        if gained:
+            # Only re-rank (and invalidate cached views) if a balance moved
+            self.sums["bank"] += gained
+            self._rerank(rows.tolist(), old_keys)
+        return paid
+
+    def _pop_due(self, now):
+        """
+        Take the rows whose interest is due by `now` off the heap.
+        :return: The rows, or None once more than a `BULK_ACCRUAL_SHARE`
+            of the accounts turn out to be due; the caller then finds them
+            all at once and rebuilds the heap.
+        """
+        heap = self._interest_due
+        last_interest_time = self.columns["last_interest_time"]
+        limit = max(1024, self.size // BULK_ACCRUAL_SHARE)
+        rows = set()
+        popped = 0
+        while heap and heap[0][0] <= now:
+            popped += 1
+            if popped > limit:
+                return None
+            due_time, row = heapq.heappop(heap)
+            # Entries from before the row last accrued are stale
+            if due_time == last_interest_time[row] + INTEREST_PERIOD:
+                rows.add(row)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def _rebuild_interest_due(self):
+        """Recreate the due-time heap from the interest timestamps."""
+        due_times = self.column("last_interest_time") + INTEREST_PERIOD
+        order = np.argsort(due_times, kind="stable")
+        # A sorted list already is a heap
+        self._interest_due = list(zip(due_times[order].tolist(), order.tolist()))
+
+    def set_interest_time(self, row, value):
+        """
+        Change when an account last accrued interest.
+        :param row: The account's row.
+        :param value: The new timestamp.
+        """
+        self.columns["last_interest_time"][row] = value
+        heapq.heappush(self._interest_due, (float(self.columns["last_interest_time"][row]) + INTEREST_PERIOD, row))
+
+    def _old_keys(self, rows):
+        """
+        The rank keys of rows whose balances are about to change.
+        :param rows: The rows.
+        :return: The keys for `_rerank`, or None if the batch is large enough
+            that `_rerank` rebuilds the index instead.
+        """
+        if len(rows) > self.size // 8:
+            return None
+        return [self._rank_key(row) for row in rows]
+
+    def _rerank(self, rows, old_keys):
+        """
+        Move rows whose balances changed to their new place in the rank index.
+        Large batches rebuild the index instead of moving rows one by one.
+        :param rows: The changed rows.
+        :param old_keys: Each row's rank key from before the change, from
+            `_old_keys` (None to rebuild).
+        """
+        self.version += 1
+        if old_keys is None:
+            self._rebuild_ranking()
+            return
+        for row, old_key in zip(rows, old_keys):
+            self.ranking.remove(old_key)
+            self.ranking.add(self._rank_key(row))
+
+    def _rebuild_ranking(self):
+        """
+        Rebuild the rank index from the balance columns. The totals are
+        sorted with NumPy when they cannot overflow int64, so the index is
+        built from keys that are already in order.
+        """
+        wallets, banks = self.column("wallet"), self.column("bank")
+        bound = max(-int(wallets.min()), int(wallets.max()), -int(banks.min()), int(banks.max())) if self.size else 0
+        if bound < 2 ** 62:
+            totals = wallets + banks
+            order = np.argsort(-totals, kind="stable")
+            totals = totals[order]
+            if bound < 2 ** 30:
+                # The packed keys fit in int64 too
+                keys = ((-totals << 32) | order).tolist()
+            else:
+                keys = ((-total << 32) | row for total, row in zip(totals.tolist(), order.tolist()))
+        else:
+            wallets, banks = wallets.tolist(), banks.tolist()
+            keys = ((-(wallet + bank) << 32) | row for row, (wallet, bank) in enumerate(zip(wallets, banks)))
+        self.ranking = RankIndex(keys)
+
+    def credit_many(self, user_ids, amount, field="wallet"):
+        """
+        Add the same amount to many accounts in one pass, opening any that
+        do not exist yet.
+        :param user_ids: The users to pay.
+        :param amount: The amount each user gets.
+        :param field: The balance to pay into ("wallet" or "bank").
+        :return: The number of accounts paid.
+        :raises ValueError: If a balance would leave the int64 range; nothing is paid.
+        """
+        rows = sorted({self.account(user_id).row for user_id in user_ids})
+        if rows:
+            column = self.columns[field][rows]
+            check_balance(int(column.max()) + amount)
+            check_balance(int(column.min()) + amount)
+        old_keys = self._old_keys(rows)
+        self.columns[field][rows] += amount
+        self.sums[field] += amount * len(rows)
+        self._rerank(rows, old_keys)
+        return len(rows)
+
+    def set_many(self, balances, field="wallet"):
+        """
+        Set many balances in one pass, opening any accounts that do not exist.
+        :param balances: Mapping of user ID to the new balance.
+        :param field: The balance to set ("wallet" or "bank").
+        :raises ValueError: If a balance is outside the int64 range.
+        """
+        for value in balances.values():
+            check_balance(value)
+        rows = [self.account(user_id).row for user_id in balances]
+        old_keys = self._old_keys(rows)
+        old_sum = sum(self.columns[field][rows].tolist())
+        self.columns[field][rows] = list(balances.values())
+        self.sums[field] += sum(self.columns[field][rows].tolist()) - old_sum
+        self._rerank(rows, old_keys)
+
+    def tax(self, basis_points):
+        """
+        Take a share of every positive wallet and bank balance, rounding
+        each amount taken down.
+        :param basis_points: The tax rate in hundredths of a percent.
+        :return: The total amount collected.
+        """
+        collected = 0
+        for field in INT_FIELDS:
+            column = self.column(field)
+            # Split the multiply so it cannot overflow int64: floor(b * r / 10000)
+            balances = np.maximum(column, 0)
+            taken = balances // 10000 * basis_points + balances % 10000 * basis_points // 10000
+            column -= taken
+            field_collected = sum(taken.tolist())
+            self.sums[field] -= field_collected
+            collected += field_collected
+        # Every balance shrank by the same rate, but rounding can reorder ties
+        self._rebuild_ranking()
+        self.version += 1
+        return collected
+
+    def reset_cooldowns(self, fields):
+        """
+        Clear cooldown timestamps on every account.
+        :param fields: The cooldown fields to clear.
+        """
+        for field in fields:
+            self.column(field)[:] = 0
+
+    def ranked(self, start, stop):
+        """
+        Accounts ranked by wallet + bank, richest first; ties keep the order
+        the accounts were opened in.
+        :param start: Index of the first rank to return (0-based).
+        :param stop: Index after the last rank to return.
+        :return: List of `UserAccount` views.
+        """
+        return [UserAccount(self, key & 0xFFFFFFFF) for key in self.ranking.slice(start, stop)]
+
+    def rank(self, user_id):
+        """
+        A user's leaderboard position.
+        :param user_id: The user's ID.
+        :return: The 1-based rank, or None if the user has no account.
+        """
+        row = self.index.get(user_id)
+        if row is None:
+            return None
+        return self.ranking.rank(self._rank_key(row)) + 1
+
+    def total_at(self, position):
+        """
+        The wallet + bank total at a leaderboard position, read from the
+        rank index in O(log n).
+        :param position: The 0-based position, richest first.
+        """
+        (key,) = self.ranking.slice(position, position + 1)
+        return -(key >> 32)
+
+    def quantile(self, q):
+        """
+        The wallet + bank total at a quantile of all accounts, exact.
+        :param q: The quantile, from 0 (poorest) to 1 (richest).
+        :return: The total, or None if there are no accounts.
+        """
+        if not self.size:
+            return None
+        return self.total_at(self.size - 1 - round(q * (self.size - 1)))
+
+    def gini(self, samples=256):
+        """
+        Approximate Gini coefficient of wallet + bank totals, costing
+        O(samples log n) at any population. Accounts are split into
+        `samples` equal slices by rank; each slice is estimated from its
+        middle account, except the richest, which gets whatever the exact
+        running sums leave over, so a heavy top tail is not missed.
+        :param samples: The number of slices.
+        :return: A value from 0 (equal) to 1 (one user holds everything), or
+            None if there are no accounts or no money.
+        """
+        total = self.sums["wallet"] + self.sums["bank"]
+        if not self.size or total <= 0:
+            return None
+        count = min(samples, self.size)
+        bounds = [i * self.size // count for i in range(count + 1)]
+
+        # Slice sums from poorest to richest
+        shares = []
+        for start, stop in zip(bounds, bounds[1:-1]):
+            middle = self.total_at(self.size - 1 - (start + stop) // 2)
+            shares.append((stop - start) * middle)
+        shares.append(total - sum(shares))
+
+        # 1 - 2 * area under the Lorenz curve, by trapezoids
+        area, cumulative = 0.0, 0
+        for (start, stop), share in zip(zip(bounds, bounds[1:]), shares):
+            previous, cumulative = cumulative, cumulative + share
+            area += (stop - start) / self.size * (previous + cumulative) / (2 * total)
+        return 1 - 2 * area
+
+    def snapshot(self, user_ids=None):
+        """
+        Copy accounts out of the store, a whole column at a time. Cheap
+        enough to take on the event loop; converting the copy to dicts with
+        `BalanceSnapshot.to_rows` can then happen on another thread.
+        :param user_ids: The accounts to copy (all if omitted); unknown IDs
+            are skipped.
+        :return: A `BalanceSnapshot`.
+        """
+        if user_ids is None:
+            return BalanceSnapshot(
+                self.ids[:self.size].copy(),
+                {field: column[:self.size].copy() for field, column in self.columns.items()})
+        rows = [self.index[user_id] for user_id in user_ids if user_id in self.index]
+        # Indexing with a list of rows copies
+        return BalanceSnapshot(self.ids[rows], {field: column[rows] for field, column in self.columns.items()})
+
+    def to_rows(self, user_ids=None):
+        """
+        Convert accounts to their stored form.
+        :param user_ids: The accounts to convert (all if omitted); unknown
+            IDs are skipped.
+        :return: Mapping of user ID string to account dict.
+        """
+        return self.snapshot(user_ids).to_rows()
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __contains__(self, user_id):
+        return user_id in self.index
+
+    def get(self, user_id, default=None):
+        """Return the user's account, or `default` if they have none."""
+        row = self.index.get(user_id)
+        return default if row is None else UserAccount(self, row)
+
+    def items(self):
+        """Iterate over `(user_id, UserAccount)` pairs."""
+        for user_id, row in self.index.items():
+            yield user_id, UserAccount(self, row)
+
+    def values(self):
+        """Iterate over every `UserAccount`."""
+        for row in self.index.values():
+            yield UserAccount(self, row)
+
+
+class BalanceSnapshot:
+    """A copy of some accounts' columns, detached from the `BalanceStore`."""
+
+    def __init__(self, ids, columns):
+        """
+        :param ids: Array of user IDs.
+        :param columns: Mapping of field to an array of values in the same order.
+        """
+        self.ids = ids
+        self.columns = columns
+
+    def to_rows(self):
+        """
+        Convert the accounts to their stored form, as `UserAccount.to_dict`
+        does, leaving out unused cooldowns.
+        :return: Mapping of user ID string to account dict.
+        """
+        values = {field: column.tolist() for field, column in self.columns.items()}
+        rows = {}
+        for i, user_id in enumerate(self.ids.tolist()):
+            data = {
+                "wallet": values["wallet"][i],
+                "bank": values["bank"][i],
+                "last_interest_time": values["last_interest_time"][i],
+            }
+            for field in COOLDOWN_FIELDS:
+                value = values[field][i]
+                if value:
+                    data[field] = value
+            rows[str(user_id)] = data
+        return rows
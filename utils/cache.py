@@ -0,0 +1,184 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import time
+import discord
+from collections import OrderedDict
+from utils.log import get_logger
+
+log = get_logger("cache")
+
+
+class VersionedCache:
+    """
+    Caches values built by coroutines, all tied to one version of the
+    underlying data: entries are dropped as soon as a newer version is
+    requested. Concurrent requests for a value that is still being built
+    share the one build instead of starting their own.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._values = {}
+        self._building = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key, version, build):
+        """
+        Return a cached value, building it if needed.
+        :param key: The value's key (e.g., a page number).
+        :param version: The current version of the data it is built from.
+        :param build: Coroutine function producing the value.
+        :return: The value.
+        """
+        if version != self.version:
+            self.version = version
+            self._values.clear()
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+
+        self.misses += 1
+        build_key = (version, key)
+        task = self._building.get(build_key)
+        if task is None:
+            task = asyncio.ensure_future(build())
+            self._building[build_key] = task
+            task.add_done_callback(lambda _: self._building.pop(build_key, None))
+        # Shielded so one caller giving up does not cancel the shared build
+        value = await asyncio.shield(task)
+        if self.version == version:
+            self._values[key] = value
+        return value
+
+    def clear(self):
+        """Drop every cached value."""
+        self._values.clear()
+
+
+_MISSING = object()
+
+
+class UserCache:
+    """
+    Resolves user IDs to `discord.User` objects as cheaply as possible:
+    first from the gateway cache, then from an LRU of users fetched
+    earlier (each kept for `ttl` seconds), and only then over REST.
+    Concurrent lookups of the same uncached user share one REST call.
+    """
+
+    def __init__(self, capacity=10000, ttl=3600):
+        """
+        :param capacity: The number of fetched users to keep.
+        :param ttl: Seconds a fetched user (or a miss) stays cached.
+        """
+        self.bot = None
+        self.capacity = capacity
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._fetching = {}
+        self.stats = {"gateway": 0, "cached": 0, "fetched": 0, "shared": 0, "failed": 0}
+
+    def __len__(self):
+        return len(self._users)
+
+    def bind(self, bot):
+        """Use a bot's gateway cache and HTTP client."""
+        self.bot = bot
+
+    def get(self, user_id):
+        """
+        Look a user up without any network request.
+        :param user_id: The user's ID.
+        :return: The user, or None if not cached or known not to exist.
+        """
+        user = self._lookup(user_id)
+        return None if user is _MISSING else user
+
+    def _lookup(self, user_id):
+        """Check the gateway cache, then the LRU; `_MISSING` if neither knows."""
+        user = self.bot.get_user(user_id) if self.bot is not None else None
+        if user is not None:
+            self.stats["gateway"] += 1
+            return user
+        entry = self._users.get(user_id)
+        if entry is not None:
+            expires, user = entry
+            if expires > time.monotonic():
+                self._users.move_to_end(user_id)
+                self.stats["cached"] += 1
+                return user
+            del self._users[user_id]
+        return _MISSING
+
+    def put(self, user, user_id=None):
+        """
+        Remember a user (or, with `user_id`, that a user does not exist).
+        :param user: The `discord.User` or `discord.Member`, or None.
+        :param user_id: The ID, needed when `user` is None.
+        """
+        user_id = user.id if user is not None else user_id
+        self._users[user_id] = (time.monotonic() + self.ttl, user)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.capacity:
+            self._users.popitem(last=False)
+
+    async def resolve(self, user_id):
+        """
+        Look a user up, fetching them over REST if they are not cached.
+        :param user_id: The user's ID.
+        :return: The user, or None if they do not exist or the fetch failed.
+        """
+        user = self._lookup(user_id)
+        if user is not _MISSING:
+            return user
+
+        task = self._fetching.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(user_id))
+            self._fetching[user_id] = task
+            task.add_done_callback(lambda _: self._fetching.pop(user_id, None))
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, user_ids):
+        """
+        Look several users up, fetching the uncached ones concurrently.
+        :param user_ids: The users' IDs.
+        :return: Mapping of user ID to user (None if not found).
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(*(self.resolve(user_id) for user_id in user_ids))
+        return dict(zip(user_ids, users))
+
+    async def _fetch(self, user_id):
+        """Fetch a user over REST and cache the result."""
+        self.stats["fetched"] += 1
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            user = None
+        except discord.HTTPException as e:
+            # Transient failure: report it but do not cache it
+            self.stats["failed"] += 1
+            log.warning("Failed to fetch user %s: %s", user_id, e)
+            return None
+        self.put(user, user_id)
+        return user
@@ -0,0 +1,196 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import heapq
+import time
+import numpy as np
+
+
+class Cooldown:
+    """A named cooldown: the account field holding its last use, and its length."""
+
+    __slots__ = ("name", "field", "duration")
+
+    def __init__(self, name, field, duration):
+        """
+        :param name: The cooldown's name (e.g., "daily").
+        :param field: The `UserAccount` timestamp field it is stored in.
+        :param duration: Length of the cooldown in seconds.
+        """
+        self.name = name
+        self.field = field
+        self.duration = duration
+
+
+COOLDOWNS = {
+    cooldown.name: cooldown for cooldown in (
+        Cooldown("daily", "last_daily", 86400),
+        Cooldown("weekly", "last_weekly", 604800),
+        Cooldown("monthly", "last_monthly", 2592000),
+        Cooldown("beg", "last_beg", 300),
+        Cooldown("bankruptcy", "last_bankruptcy", 3600),
+        Cooldown("fish", "last_fish", 3600),
+    )
+}
+
+
+def format_duration(seconds):
+    """
+    Format a duration for users, leaving out leading zero units.
+    :param seconds: The duration in seconds.
+    :return: A string such as "2d 3h 4m 5s" or "4m 5s".
+    """
+    days, remainder = divmod(int(seconds), 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    parts = [(days, "d"), (hours, "h"), (minutes, "m")]
+    while parts and parts[0][0] == 0:
+        parts.pop(0)
+    return " ".join(f"{value}{unit}" for value, unit in parts + [(seconds, "s")])
+
+
+class CooldownManager:
+    """
+    Checks and starts named cooldowns, and announces when they run out.
+    Each cooldown's last use lives in a timestamp column of the account
+    store, so checks are a single subtraction. Upcoming expiries are kept in
+    a min-heap served by one timer, so "cooldown ready" subscribers are
+    called right when a cooldown ends instead of by polling every account.
+    The heap is only filled once something subscribes.
+    """
+
+    def __init__(self, manager, definitions=COOLDOWNS):
+        """
+        :param manager: The `BotManager` holding the account store.
+        :param definitions: Mapping of cooldown name to `Cooldown`.
+        """
+        self.manager = manager
+        self.definitions = definitions
+        self._subscribers = []
+        # Entries are (expiry, user_id, name, started); an entry is stale
+        # once the account's timestamp no longer equals `started`.
+        self._heap = []
+        self._timer = None
+        # Running subscriber calls, referenced so they are not garbage-collected
+        self._tasks = set()
+
+    def remaining(self, account, name, now=None):
+        """
+        Seconds left on a user's cooldown.
+        :param account: The user's `UserAccount`.
+        :param name: The cooldown's name.
+        :param now: The current time (defaults to now).
+        :return: The remaining time, or 0 if the cooldown is ready.
+        """
+        cooldown = self.definitions[name]
+        now = time.time() if now is None else now
+        return max(0.0, getattr(account, cooldown.field) + cooldown.duration - now)
+
+    def ready(self, account, name, now=None):
+        """Whether a user's cooldown has run out."""
+        return self.remaining(account, name, now) == 0
+
+    def start(self, account, *names, now=None):
+        """
+        Start (or restart) one or more cooldowns for a user.
+        :param account: The user's `UserAccount`.
+        :param names: The cooldowns to start.
+        :param now: The start time (defaults to now).
+        """
+        now = time.time() if now is None else now
+        for name in names:
+            setattr(account, self.definitions[name].field, now)
+            if self._subscribers:
+                self._push(now + self.definitions[name].duration, account.user_id, name, now)
+
+    def reset(self, account, *names):
+        """
+        Clear cooldowns so they are ready immediately.
+        :param account: The user's `UserAccount`.
+        :param names: The cooldowns to clear (all if omitted).
+        """
+        for name in names or self.definitions:
+            setattr(account, self.definitions[name].field, 0.0)
+
+    def subscribe(self, callback):
+        """
+        Call a coroutine function whenever a cooldown runs out.
+        :param callback: Called as `await callback(user_id, name)`.
+        """
+        first = not self._subscribers
+        self._subscribers.append(callback)
+        if first:
+            self.schedule_all()
+
+    def unsubscribe(self, callback):
+        """Stop calling a subscriber; the heap is dropped once none are left."""
+        self._subscribers.remove(callback)
+        if not self._subscribers:
+            self._heap = []
+            self._arm()
+
+    def schedule_all(self, now=None):
+        """
+        Rebuild the expiry heap from the account store, e.g. after it is
+        reloaded. Does nothing while there are no subscribers.
+        :param now: The current time (defaults to now).
+        """
+        self._heap = []
+        if not self._subscribers:
+            return
+        now = time.time() if now is None else now
+        store = self.manager.currency_data
+        ids = store.ids[:store.size]
+        for name, cooldown in self.definitions.items():
+            started = store.column(cooldown.field)
+            for row in np.flatnonzero(started + cooldown.duration > now).tolist():
+                self._heap.append(
+                    (float(started[row]) + cooldown.duration, int(ids[row]), name, float(started[row])))
+        heapq.heapify(self._heap)
+        self._arm()
+
+    def _push(self, expiry, user_id, name, started):
+        """Add an expiry, moving the timer forward if it is now the earliest."""
+        heapq.heappush(self._heap, (expiry, user_id, name, started))
+        if self._heap[0][0] == expiry:
+            self._arm()
+
+    def _arm(self):
+        """Point the timer at the earliest expiry."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            delay = max(0.0, self._heap[0][0] - time.time())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._fire)
+
+    def _fire(self):
+        """Announce every cooldown that has run out, then re-arm the timer."""
+        self._timer = None
+        now = time.time()
+        store = self.manager.currency_data
+        while self._heap and self._heap[0][0] <= now:
+            _, user_id, name, started = heapq.heappop(self._heap)
+            account = store.get(user_id)
+            if account is None or getattr(account, self.definitions[name].field) != started:
+                continue  # Restarted or cleared since this entry was pushed
+            for callback in self._subscribers:
+                task = asyncio.get_running_loop().create_task(callback(user_id, name))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        self._arm()
@@ -0,0 +1,155 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import importlib.abc
+import importlib.machinery
+import os
+import sys
+import time
+from utils.log import get_logger
+
+log = get_logger("extensions")
+
+
+def discover_extensions(folders=("user", "admin", "owner"), extras=("cogs.help",)):
+    """
+    List the bot's extensions: every module in the cog folders, then extras.
+    :param folders: Folders under `cogs/` to scan.
+    :param extras: Extensions outside those folders.
+    :return: List of extension names (e.g., "cogs.user.currency").
+    """
+    extensions = []
+    for folder in folders:
+        for file in sorted(os.listdir(f"cogs/{folder}")):
+            if file.endswith(".py") and not file.startswith("__"):
+                extensions.append(f"cogs.{folder}.{file[:-3]}")
+    extensions.extend(extras)
+    return extensions
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Times the module body of each extension as discord.py imports it, so a
+    load can be split into import and `setup()` time. discord.py looks
+    extensions up with `importlib.util.find_spec`, which asks this finder
+    first while it is installed; the module still runs only once.
+    """
+
+    def __init__(self, names):
+        """
+        :param names: The extension names to time.
+        """
+        self.names = set(names)
+        # Extension name -> seconds its module body took
+        self.seconds = {}
+
+    def find_spec(self, name, path=None, target=None):
+        if name not in self.names:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(name, path)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def timed_exec_module(module):
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                self.seconds[name] = time.perf_counter() - started
+
+        # Each lookup gets a fresh loader, so only this import is timed
+        spec.loader.exec_module = timed_exec_module
+        return spec
+
+
+class ExtensionLoader:
+    """
+    Loads extensions one at a time, timing how long each module takes to
+    import and how long its `setup()` takes. They are not loaded in
+    threads: imports hold the GIL, and by the time bot.py loads the cogs
+    their shared dependencies are already imported, so that measured no
+    faster than loading them in turn.
+    Extensions listed as deferred are left out of `load()` so the bot can
+    connect first, and are loaded with `load_deferred()` once it is ready.
+    """
+
+    def __init__(self, bot, extensions, deferred=()):
+        """
+        :param bot: The bot to load extensions into.
+        :param extensions: The extension names, in load order.
+        :param deferred: The names of extensions to load only after connecting.
+        """
+        self.bot = bot
+        self.deferred = [name for name in extensions if name in deferred]
+        self.eager = [name for name in extensions if name not in deferred]
+        # Extension name -> {"import": seconds, "setup": seconds, "error": str or None}
+        self.timings = {}
+        # Phase -> seconds
+        self.phases = {}
+        self._deferred_loaded = False
+
+    async def load(self):
+        """Load the extensions that are not deferred."""
+        await self._load_all(self.eager, "startup")
+
+    async def load_deferred(self):
+        """Load the deferred extensions, once (later calls do nothing)."""
+        if self._deferred_loaded or not self.deferred:
+            return
+        self._deferred_loaded = True
+        await self._load_all(self.deferred, "deferred")
+
+    async def _load_all(self, names, phase):
+        started = time.perf_counter()
+        timer = _ImportTimer(names)
+        sys.meta_path.insert(0, timer)
+        try:
+            # Setups run one after another: they register commands on the shared bot
+            for name in names:
+                await self._load(name, timer)
+        finally:
+            sys.meta_path.remove(timer)
+        self.phases[phase] = time.perf_counter() - started
+        self.report(names, phase)
+
+    async def _load(self, name, timer):
+        started = time.perf_counter()
+        error = None
+        try:
+            await self.bot.load_extension(name)
+        except Exception as e:
+            error = str(e)
+        load_time = time.perf_counter() - started
+        import_time = timer.seconds.get(name, 0.0)
+        self.timings[name] = {"import": import_time, "setup": load_time - import_time, "error": error}
+
+    def report(self, names, phase):
+        """Log the phase time and each extension's import and setup time."""
+        timings = [self.timings[name] for name in names]
+        loaded = sum(1 for timing in timings if not timing["error"])
+        log.info("Loaded %d of %d %s extensions in %.0f ms (imports %.0f ms, setup %.0f ms)",
+                 loaded, len(names), phase, self.phases[phase] * 1000,
+                 sum(timing["import"] for timing in timings) * 1000,
+                 sum(timing["setup"] for timing in timings) * 1000)
+        for name in sorted(names, key=lambda name: -(self.timings[name]["import"] + self.timings[name]["setup"])):
+            timing = self.timings[name]
+            if timing["error"]:
+                log.error("Failed to load extension %s: %s", name, timing["error"])
+            else:
+                log.info("  %-28s import %7.1f ms, setup %7.1f ms",
+                         name, timing["import"] * 1000, timing["setup"] * 1000)
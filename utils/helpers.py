@@ -16,11 +16,22 @@
 
 
 from discord.ext.commands import CheckFailure
-import json
+import asyncio
 import time
-from collections import defaultdict, deque
+import config
+from concurrent.futures import ThreadPoolExecutor
+from utils.balances import BalanceSnapshot, BalanceStore
+from utils.cache import UserCache
+from utils.cooldowns import CooldownManager
+from utils.inventory import Inventory, ItemCatalog
+from utils.loot import LootEngine
+from utils.outbox import Outbox
+from utils.replies import ReplyRouter
+from utils.snipes import SnipeStore
+from utils.storage import copy_json, create_storage
+from utils.transactions import AccountLocks, Transaction
+from collections import Counter, defaultdict
 from discord.ext import commands
-from PIL import Image
 
 
 class BotManager:
@@ -31,11 +42,15 @@ class BotManager:
         self.admins = {}
         self.users = {}
         self.afk = {}
-        self.summons = {}
-        self.currency_data = {}
         self.blacklist = set()
-        self.deleted_messages = defaultdict(deque)
-        self.edited_messages = defaultdict(deque)
+        # Snipe caches: deleted messages keep (content,), edits keep (before, after)
+        snipe_settings = {
+            "max_age": getattr(config, "SNIPE_MAX_AGE", 900),
+            "per_channel": getattr(config, "SNIPE_PER_CHANNEL", 50),
+            "byte_budget": getattr(config, "SNIPE_MEMORY_BUDGET", 4 * 1024 * 1024),
+        }
+        self.deleted_messages = SnipeStore(**snipe_settings)
+        self.edited_messages = SnipeStore(**snipe_settings)
         self.global_restricted = False
         self.paused = False
         self.data_files = {
@@ -45,6 +60,7 @@ class BotManager:
             "inventory": "data/inventory.json",
             "shop": "data/shop.json",
             "loot_tables": "data/loottables.json",
+            "birthdays": "data/birthdays.json",
         }
         self.data_cache = {
             "users": {},
@@ -53,7 +69,44 @@ class BotManager:
             "inventory": {},
             "shop": {},
             "loot_tables": {},
+            "birthdays": {},
         }
+        self.summons = self.data_cache["summons"]
+        self.currency_data = self.data_cache["currency"] = BalanceStore()
+        self.birthdays = self.data_cache["birthdays"]
+        self.account_locks = AccountLocks(getattr(config, "ACCOUNT_LOCK_STRIPES", 256))
+        self.cooldowns = CooldownManager(self)
+        self.loot = LootEngine(self)
+        self.replies = ReplyRouter()
+        self.catalog = ItemCatalog()
+        # The running `LogService`, set up by bot.py
+        self.logs = None
+        self.user_cache = UserCache(
+            capacity=getattr(config, "USER_CACHE_SIZE", 10000), ttl=getattr(config, "USER_CACHE_TTL", 3600))
+        self.outbox = Outbox(window=getattr(config, "OUTBOX_WINDOW", 1.0))
+
+        self.storage = create_storage(config, self.data_files)
+
+        # Write-behind state: saves only mark a dataset dirty, and a single
+        # background task writes everything dirty once the window elapses.
+        # Each dirty key maps to the set of changed rows, or None when the
+        # whole dataset has to be rewritten.
+        self.save_interval = getattr(config, "SAVE_INTERVAL", 5.0)
+        self._dirty = {}
+        self._flush_task = None
+        # Dataset key -> number of flushes currently writing it; those rows
+        # are no longer in `_dirty` but are not on disk yet either
+        self._writing = Counter()
+        # Datasets read from storage at least once. Until then the cached
+        # copy is only the empty startup default.
+        self._loaded = set()
+
+        # File I/O and serialization run on worker threads. Each dataset has
+        # its own lock so reads and writes of one file happen strictly in
+        # order, while different files can be written in parallel.
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=getattr(config, "IO_WORKERS", 2), thread_name_prefix="bot-io")
+        self._io_locks = defaultdict(asyncio.Lock)
 
     async def load_data(self, key):
         """
@@ -64,29 +117,153 @@ class BotManager:
         if not file_path:
             print(f"Error: No file path mapped for key '{key}'.")
             return {}
-        try:
-            with open(file_path, "r") as file:
-                self.data_cache[key] = json.load(file)
+        async with self._io_locks[key]:
+            if key in self._loaded and (key in self._dirty or self._writing[key]):
+                # Unflushed changes are newer than anything on disk. Before
+                # the first load they were made to the empty default and
+                # would replace the stored data, so storage wins then.
                 return self.data_cache[key]
-        except (FileNotFoundError, json.JSONDecodeError):
-            print(f"Error loading data from {file_path}. Using defaults.")
-            self.data_cache[key] = {}
-            return {}
-
-    async def save_data(self, key):
+            try:
+                self.data_cache[key] = await asyncio.get_running_loop().run_in_executor(
+                    self._io_executor, self.storage.load, key)
+                self._loaded.add(key)
+            except FileNotFoundError:
+                # Nothing stored yet, so there is nothing to lose either
+                print(f"Error loading data from {file_path}. Using defaults.")
+                self.data_cache[key] = {}
+                self._loaded.add(key)
+            except ValueError:
+                # ValueError covers invalid JSON and unreadable binary snapshots
+                print(f"Error loading data from {file_path}. Using defaults.")
+                self.data_cache[key] = {}
+            return self.data_cache[key]
+
+    async def save_data(self, key, *rows):
         """
-        Save data to a file based on a key.
+        Schedule data to be saved to a file based on a key.
+        The write is deferred and coalesced with other saves made within
+        `save_interval` seconds; use `flush` to write immediately.
         :param key: The identifier for the data (e.g., "currency").
+        :param rows: The changed row keys (e.g., user IDs). If none are given,
+            the whole dataset is written.
         """
-        file_path = self.data_files.get(key)
-        if not file_path:
+        if key not in self.data_files:
             print(f"Error: No file path mapped for key '{key}'.")
             return
+        self.mark_dirty(key, *rows)
+
+    def mark_dirty(self, key, *rows):
+        """
+        Flag a dataset as changed and make sure a flush is scheduled.
+        :param key: The identifier for the data (e.g., "currency").
+        :param rows: The changed row keys. If none are given, the whole
+            dataset is marked dirty.
+        """
+        if not rows:
+            self._dirty[key] = None
+        elif key not in self._dirty:
+            self._dirty[key] = {str(row) for row in rows}
+        elif self._dirty[key] is not None:
+            self._dirty[key].update(str(row) for row in rows)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._delayed_flush())
+
+    async def _delayed_flush(self):
+        """Wait out the coalescing window, then write all dirty datasets."""
+        await asyncio.sleep(self.save_interval)
+        # Past this point the task is writing and must not be cancelled.
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write every dirty dataset to disk now (used on stop/shutdown)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        dirty, self._dirty = self._dirty, {}
+        self._writing.update(dirty.keys())
         try:
-            with open(file_path, "w") as file:
-                json.dump(self.data_cache[key], file, indent=4)
-        except Exception as e:
-            print(f"Error saving data to {file_path}: {e}")
+            results = await asyncio.gather(*(self._write(key, rows) for key, rows in dirty.items()))
+        finally:
+            self._writing.subtract(dirty.keys())
+        for (key, rows), written in zip(dirty.items(), results):
+            if not written:
+                # Keep it dirty so the next save retries the write.
+                self.mark_dirty(key, *(rows or ()))
+
+    async def _write(self, key, rows):
+        """
+        Snapshot a dataset and hand it to the storage backend on the I/O
+        executor. The snapshot is taken on the event loop, so it is
+        consistent, and only holds the rows the backend will write.
+        :param key: The identifier for the data (e.g., "currency").
+        :param rows: The changed row keys, or None to write everything.
+        :return: True if the data was written.
+        """
+        async with self._io_locks[key]:
+            snapshot = self._snapshot(key, rows)
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._io_executor, self._save, key, snapshot, rows)
+                return True
+            except Exception as e:
+                print(f"Error saving {key} data: {e}")
+                return False
+
+    def _snapshot(self, key, rows):
+        """
+        Copy the rows of a dataset that the storage backend needs, in their
+        stored (JSON-style, string-keyed) form, or as a `BalanceSnapshot`
+        of columns for currency.
+        :param key: The identifier for the data (e.g., "currency").
+        :param rows: The changed row keys, or None to write everything.
+        """
+        data = self.data_cache[key]
+        if key != "currency":
+            needed = self.storage.rows_to_snapshot(key, data, rows)
+            if needed is None:
+                return copy_json(data)
+            return {row: copy_json(data[row]) for row in needed if row in data}
+
+        # Accounts live in a BalanceStore: only their columns are copied
+        # here, and `_save` turns them into dicts on the I/O executor.
+        needed = self.storage.rows_to_snapshot(key, map(str, data), rows)
+        return data.snapshot(None if needed is None else map(int, needed))
+
+    def _save(self, key, snapshot, rows):
+        """
+        Write a snapshot with the storage backend (runs on the I/O executor).
+        :param key: The identifier for the data (e.g., "currency").
+        :param snapshot: The rows from `_snapshot`.
+        :param rows: The changed row keys, or None to write everything.
+        """
+        if isinstance(snapshot, BalanceSnapshot):
+            snapshot = snapshot.to_rows()
+        self.storage.save(key, snapshot, rows)
+
+    async def load_all(self):
+        """
+        Read every dataset from storage. Run it before the bot connects, so
+        no command can change a dataset before it is loaded.
+        """
+        await self.load_users()
+        await self.load_summons()
+        await self.load_currency_data()
+        await self.load_inventory()
+        await self.load_shop()
+        await self.load_loot_tables()
+        await self.load_birthdays()
+
+    async def close(self):
+        """Flush all data, wait for pending writes and release storage."""
+        await self.flush()
+        for lock in list(self._io_locks.values()):
+            async with lock:
+                pass
+        self._io_executor.shutdown()
+        self.storage.close()
 
     # Specialized methods to manage user data
     async def load_users(self):
@@ -110,53 +287,99 @@ class BotManager:
     # Specialized methods for summons
     async def load_summons(self):
         """Load summon-related data."""
-        self.data_cache["summons"] = await self.load_data("summons")
+        self.summons = await self.load_data("summons")
 
-    async def save_summons(self):
-        """Save summon-related data."""
-        await self.save_data("summons")
+    async def save_summons(self, *user_ids):
+        """
+        Save summon-related data.
+        :param user_ids: The users whose summon lists changed (all if omitted).
+        """
+        await self.save_data("summons", *user_ids)
 
     async def load_currency_data(self):
-        """Load currency data from the JSON file."""
-        try:
-            with open("data/currency.json", "r") as file:
-                self.currency_data = json.load(file)
-                # Initialize missing fields
-                for user_id, data in self.currency_data.items():
-                    if "wallet" not in data:
-                        data["wallet"] = 0
-                    if "bank" not in data:
-                        data["bank"] = 0
-                    if "last_interest_time" not in data:
-                        data["last_interest_time"] = time.time()
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Currency data not found or invalid. Initializing with empty data.")
-            self.currency_data = {}
-
-    async def save_currency_data(self):
-        """Save currency data to the JSON file."""
-        try:
-            with open("data/currency.json", "w") as file:
-                json.dump(self.currency_data, file, indent=4)
-        except Exception as e:
-            print(f"Error saving currency data: {e}")
+        """Load currency data into the columnar account store."""
+        stored = await self.load_data("currency")
+        if stored is self.currency_data:
+            # Unflushed accounts already in memory are newer than storage.
+            return
+        # Building the columns and rank index is CPU-bound; keep it off the event loop
+        store = await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, BalanceStore.from_rows, stored)
+        self.currency_data = self.data_cache["currency"] = store
+        self.cooldowns.schedule_all()
+
+    def get_account(self, user_id):
+        """
+        Retrieve or open a user's currency account, with any interest it has
+        earned since it was last read paid into the bank.
+        :param user_id: The user's ID.
+        :return: The user's `UserAccount`.
+        """
+        account = self.currency_data.account(user_id)
+        if self.currency_data.accrue_interest([account.row]):
+            self.mark_dirty("currency", user_id)
+        return account
+
+    def transaction(self, *user_ids):
+        """
+        Start an atomic change to one or more currency accounts.
+        Use as `async with bot_manager.transaction(a, b) as txn:`.
+        :param user_ids: Every account the transaction may touch.
+        :return: A `Transaction`.
+        """
+        return Transaction(self, user_ids)
+
+    def accrue_all_interest(self):
+        """
+        Pay outstanding interest on every account that is due, e.g. before
+        ranking them. Cheap when nothing is due, so it can run per command.
+        """
+        paid = self.currency_data.accrue_interest()
+        if paid:
+            self.mark_dirty("currency", *paid)
+
+    async def save_currency_data(self, *user_ids):
+        """
+        Save currency data.
+        :param user_ids: The users whose balances changed (all if omitted).
+        """
+        await self.save_data("currency", *user_ids)
 
     # Inventory management
+    async def load_inventory(self):
+        """Load inventories, converting legacy item lists to item counts."""
+        inventories = await self.load_data("inventory")
+        legacy = [user_id for user_id, items in inventories.items() if isinstance(items, list)]
+        for user_id, items in inventories.items():
+            if not isinstance(items, Inventory):
+                inventories[user_id] = Inventory.from_stored(items)
+        if legacy:
+            # Rewrite the converted users in the compact format
+            self.mark_dirty("inventory", *legacy)
+
     def get_inventory(self, user_id):
-        """Retrieve or initialize a user's inventory."""
+        """
+        Retrieve or initialize a user's inventory.
+        :param user_id: The user's ID.
+        :return: The user's `Inventory` (item ID -> count).
+        """
         user_id = str(user_id)
         if user_id not in self.data_cache["inventory"]:
-            self.data_cache["inventory"][user_id] = []
+            self.data_cache["inventory"][user_id] = Inventory()
         return self.data_cache["inventory"][user_id]
 
-    async def save_inventory(self):
-        """Save inventory data."""
-        await self.save_data("inventory")
+    async def save_inventory(self, *user_ids):
+        """
+        Save inventory data.
+        :param user_ids: The users whose inventories changed (all if omitted).
+        """
+        await self.save_data("inventory", *user_ids)
 
     # Shop management
     async def load_shop(self):
         """Load shop data."""
         self.data_cache["shop"] = await self.load_data("shop")
+        self.catalog = ItemCatalog(self.data_cache["shop"])
 
     async def save_shop(self):
         """Save shop data."""
@@ -166,43 +389,20 @@ class BotManager:
     async def load_loot_tables(self):
         """Load loot table data."""
         self.data_cache["loot_tables"] = await self.load_data("loot_tables")
+        self.loot.invalidate()
 
     def get_loot_table(self, table_name):
         """Retrieve a specific loot table by name."""
         return self.data_cache["loot_tables"].get(table_name, [])
 
-    # Helper to clean up old messages
-    def clean_old_entries(self, cache, age_limit=900, max_entries=50):
-        """
-        Remove old entries from the cache.
-        :param cache: The deque to clean.
-        :param age_limit: Maximum age in seconds for an entry (default 15 minutes).
-        :param max_entries: Maximum number of entries in the cache.
-        """
-        current_time = time.time()
-        while cache and (
-            current_time -
-                cache[0]["timestamp"] > age_limit or len(cache) > max_entries
-        ):
-            cache.popleft()
-    
     # Birthday-related methods
     async def load_birthdays(self):
         """Load birthday data from the JSON file."""
-        try:
-            with open(self.data_files["birthdays"], "r") as file:
-                self.birthdays = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Birthdays data not found or invalid. Initializing with empty data.")
-            self.birthdays = {}
+        self.birthdays = await self.load_data("birthdays")
 
     async def save_birthdays(self):
         """Save birthday data to the JSON file."""
-        try:
-            with open(self.data_files["birthdays"], "w") as file:
-                json.dump(self.birthdays, file, indent=4)
-        except Exception as e:
-            print(f"Error saving birthdays data: {e}")
+        await self.save_data("birthdays")
 
     def set_birthday(self, user_id, date):
         """
@@ -236,26 +436,6 @@ class BotManager:
         today = time.strftime("%d-%m")
         return [user_id for user_id, birthday in self.birthdays.items() if birthday == today]
 
-    def add_deleted_message(self, guild_id, message):
-        """Add a deleted message to the cache."""
-        self.deleted_messages[guild_id].append(
-            {"content": message.content, "author": message.author.id,
-                "timestamp": time.time()}
-        )
-        self.clean_old_entries(self.deleted_messages[guild_id])
-
-    def add_edited_message(self, guild_id, old_message, new_message):
-        """Add an edited message to the cache."""
-        self.edited_messages[guild_id].append(
-            {
-                "old_content": old_message.content,
-                "new_content": new_message.content,
-                "author": old_message.author.id,
-                "timestamp": time.time(),
-            }
-        )
-        self.clean_old_entries(self.edited_messages[guild_id])
-
 
 class NotAuthorized(CheckFailure):
     """Custom exception for unauthorized access."""
@@ -290,6 +470,9 @@ def is_user_allowed():
     return commands.check(predicate)
 
 def resize_image(input_path, output_path, size):
+    # PIL is only needed here, so it is not imported with every cog
+    from PIL import Image
+
     with Image.open(input_path) as img:
         img = img.resize(size, Image.ANTIALIAS)
         img.save(output_path)
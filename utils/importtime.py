@@ -0,0 +1,81 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import subprocess
+import sys
+from utils.extensions import discover_extensions
+
+
+# Heavy dependencies that must only be imported on first use
+LAZY_MODULES = ("PIL", "Crypto")
+
+
+def measure(module):
+    """
+    Import a module in a fresh interpreter under `python -X importtime`.
+    :param module: The module to import (e.g., "cogs.user.currency").
+    :return: Mapping of every module imported to its cumulative time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def benchmark(modules, budget_ms=None, top=5):
+    """
+    Report the cold import time of each module and check it stays fast.
+    :param modules: The modules to measure.
+    :param budget_ms: Fail if any module takes longer than this to import.
+    :param top: The number of heaviest dependencies to list per module.
+    :return: True if no module broke the budget or imported a lazy dependency.
+    """
+    ok = True
+    for module in modules:
+        times = measure(module)
+        total = times.get(module, 0) / 1000
+        print(f"{module:<28} {total:8.1f} ms")
+        heaviest = sorted(
+            ((name, us) for name, us in times.items() if name != module and "." not in name),
+            key=lambda item: -item[1])
+        for name, us in heaviest[:top]:
+            print(f"    {name:<24} {us / 1000:8.1f} ms")
+
+        eager = sorted({name.split(".")[0] for name in times} & set(LAZY_MODULES))
+        if eager:
+            ok = False
+            print(f"    FAIL: imports {', '.join(eager)} at startup")
+        if budget_ms is not None and total > budget_ms:
+            ok = False
+            print(f"    FAIL: over the {budget_ms} ms budget")
+    return ok
+
+
+if __name__ == "__main__":
+    # python -m utils.importtime [budget_ms] [module ...]
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    sys.exit(0 if benchmark(sys.argv[2:] or ["bot"] + discover_extensions(), budget) else 1)
@@ -0,0 +1,106 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from collections import Counter
+
+
+# Share of the shop price paid back when an item is sold
+SELL_RATE = 0.3
+
+
+def item_id(name):
+    """
+    The catalog ID of an item name: lowercase with single spaces, so
+    "Fishing  Rod" and "fishing rod" are the same item. IDs derive from
+    names rather than positions, so stored inventories survive shop edits.
+    """
+    return " ".join(name.lower().split())
+
+
+class ItemCatalog:
+    """
+    Every item the shop knows about, indexed by ID, with buy and sell
+    prices worked out once when the shop is loaded.
+    """
+
+    def __init__(self, shop=None):
+        """
+        :param shop: Mapping of item name to shop price (`data/shop.json`).
+        """
+        shop = shop or {}
+        self.names = {}
+        self.prices = {}
+        self.sell_prices = {}
+        for name, price in shop.items():
+            key = item_id(name)
+            self.names[key] = name
+            self.prices[key] = int(price)
+            self.sell_prices[key] = int(int(price) * SELL_RATE)
+
+    def __contains__(self, key):
+        return key in self.prices
+
+    def lookup(self, name):
+        """
+        Resolve a user-typed item name.
+        :param name: The name as typed.
+        :return: The item ID, or None if the shop does not sell it.
+        """
+        key = item_id(name)
+        return key if key in self.prices else None
+
+    def name(self, key):
+        """The display name of an item ID (the ID itself if not in the shop)."""
+        return self.names.get(key, key)
+
+
+class Inventory(Counter):
+    """
+    A user's items as a multiset: item ID -> count. Adding, removing and
+    checking an item are O(1), and each item type is stored once with its
+    count. Items whose count drops to zero are removed.
+    """
+
+    @classmethod
+    def from_stored(cls, stored):
+        """
+        Build an inventory from its stored form.
+        :param stored: Mapping of item ID to count, or a legacy list of
+            item names with one entry per copy.
+        """
+        if isinstance(stored, list):
+            return cls(item_id(name) for name in stored)
+        return cls({key: int(count) for key, count in stored.items() if int(count) > 0})
+
+    def add(self, key, count=1):
+        """Add `count` copies of an item."""
+        self[key] += count
+
+    def remove(self, key, count=1):
+        """
+        Remove `count` copies of an item.
+        :return: True if the user had enough copies, False (and nothing
+            removed) otherwise.
+        """
+        held = self.get(key, 0)
+        if held < count:
+            return False
+        if held == count:
+            del self[key]
+        else:
+            self[key] = held - count
+        return True
@@ -0,0 +1,213 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+
+
+class Journal:
+    """
+    An append-only log of row changes for one dataset.
+    Each line is a compact JSON record `[row_id, row]`, where `row` is the
+    row's full value after the change, or null if the row was deleted.
+    Because records hold values rather than deltas, replaying a record that
+    is already reflected in the snapshot is harmless.
+    Durability: every `append` is one group commit, written and fsynced
+    before it returns, so a flush that completed survives a crash or power
+    loss. Changes still waiting in the bot's write-behind buffer (up to
+    SAVE_INTERVAL seconds' worth) are not yet durable.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of the journal file.
+        """
+        self.path = path
+        self.records = 0
+        # Rows changed since the last snapshot
+        self.rows = set()
+        self._file = None
+
+    def append(self, rows):
+        """
+        Append one record per changed row and fsync them as one commit.
+        :param rows: Mapping of row ID to its new value (None if deleted).
+        """
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write("".join(
+            json.dumps([row_id, value], separators=(",", ":")) + "\n"
+            for row_id, value in rows.items()
+        ))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records += len(rows)
+        self.rows.update(rows)
+
+    def replay(self, data):
+        """
+        Apply every record in the journal to a snapshot, in order.
+        A torn final line left by a crash is ignored and cut off so new
+        records start on a clean line.
+        :param data: The snapshot dict, updated in place.
+        :return: The updated dict.
+        """
+        self.records = 0
+        self.rows.clear()
+        valid_length = 0
+        try:
+            with open(self.path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_length += len(line)
+                    try:
+                        row_id, value = json.loads(line)
+                    except ValueError:
+                        continue
+                    if value is None:
+                        data.pop(row_id, None)
+                    else:
+                        data[row_id] = value
+                    self.records += 1
+                    self.rows.add(row_id)
+            if valid_length != os.path.getsize(self.path):
+                os.truncate(self.path, valid_length)
+        except FileNotFoundError:
+            pass
+        return data
+
+    def truncate(self):
+        """Discard all records once they are part of a snapshot."""
+        self.close()
+        with open(self.path, "w") as file:
+            os.fsync(file.fileno())
+        self.records = 0
+        self.rows.clear()
+
+    def remove(self):
+        """Delete the journal file, once its records are part of a snapshot."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records = 0
+        self.rows.clear()
+
+    def close(self):
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class JournaledStorage:
+    """
+    Wraps a storage backend so row-level saves of some datasets are appended
+    to a journal instead of rewriting the whole snapshot. The snapshot is
+    rewritten (compacted) once the journal grows past `compact_records`, and
+    loading replays the journal on top of the last snapshot.
+    With journaling turned off, saves go straight to the snapshots, but a
+    journal left on disk is still replayed on load, then compacted into the
+    snapshot and deleted, so turning it off never loses journaled changes.
+    """
+
+    def __init__(self, inner, journal_files, compact_records=10000, enabled=True):
+        """
+        :param inner: The storage backend holding the snapshots.
+        :param journal_files: Mapping of dataset key to journal file path.
+        :param compact_records: Journal length that triggers a compaction.
+        :param enabled: Whether saves are journaled.
+        """
+        self.inner = inner
+        self.journals = {key: Journal(path) for key, path in journal_files.items()}
+        self.compact_records = compact_records
+        self.enabled = enabled
+
+    def load(self, key):
+        """
+        Read the snapshot of a dataset and replay its journal.
+        :param key: The identifier for the data (e.g., "currency").
+        :return: The stored dict.
+        """
+        journal = self.journals.get(key)
+        if journal is None:
+            return self.inner.load(key)
+        try:
+            data = self.inner.load(key)
+        except FileNotFoundError:
+            if not os.path.exists(journal.path):
+                raise
+            data = {}
+        journal.replay(data)
+        if not self.enabled and os.path.exists(journal.path):
+            if journal.records:
+                self.inner.save(key, data)
+            journal.remove()
+        return data
+
+    def save(self, key, data, rows=None):
+        """
+        Journal the changed rows, or write a snapshot.
+        :param key: The identifier for the data (e.g., "currency").
+        :param data: The rows picked by `rows_to_snapshot`.
+        :param rows: Changed row keys. If None, a full snapshot is written.
+        """
+        journal = self.journals.get(key)
+        if journal is None or not self.enabled:
+            self.inner.save(key, data, rows)
+            return
+        if rows is not None and not self._compacts(journal, rows):
+            journal.append({row_id: data.get(row_id) for row_id in rows})
+            return
+        self.compact(key, data, None if rows is None else journal.rows | set(rows))
+
+    def rows_to_snapshot(self, key, row_keys, rows):
+        """
+        Pick the rows `save` needs to see: the changed rows for a journal
+        append, or what the wrapped backend needs for a compaction.
+        :param key: The identifier for the data (e.g., "currency").
+        :param row_keys: Every row key of the live dataset.
+        :param rows: Changed row keys, or None for the whole dataset.
+        :return: The row keys to snapshot, or None for all of them.
+        """
+        journal = self.journals.get(key)
+        if journal is None or not self.enabled:
+            return self.inner.rows_to_snapshot(key, row_keys, rows)
+        if rows is not None and not self._compacts(journal, rows):
+            return rows
+        pending = None if rows is None else journal.rows | set(rows)
+        return self.inner.rows_to_snapshot(key, row_keys, pending)
+
+    def _compacts(self, journal, rows):
+        """Whether journaling these rows would push the journal past its limit."""
+        return journal.records + len(rows) >= self.compact_records
+
+    def compact(self, key, data, rows=None):
+        """
+        Write a snapshot and start a fresh journal.
+        :param key: The identifier for the data (e.g., "currency").
+        :param data: The rows the wrapped backend asked for.
+        :param rows: Rows changed since the last snapshot, or None for all.
+        """
+        self.inner.save(key, data, rows)
+        self.journals[key].truncate()
+
+    def close(self):
+        """Close the journals and the wrapped backend."""
+        for journal in self.journals.values():
+            journal.close()
+        self.inner.close()
@@ -0,0 +1,178 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import logging
+import logging.handlers
+import queue
+import sys
+from collections import deque
+
+
+LOGGER_NAME = "voicebot"
+
+
+def get_logger(name=None):
+    """
+    A logger under the bot's logging tree.
+    :param name: Sub-logger name (e.g., "events"), or None for the root.
+    """
+    return logging.getLogger(LOGGER_NAME if name is None else f"{LOGGER_NAME}.{name}")
+
+
+def log_event(logger, level, event, **fields):
+    """
+    Log a structured event: a name plus key=value fields. Fields are only
+    turned into text by the listener thread, and nothing is built at all
+    unless the level is enabled.
+    :param logger: The logger to use.
+    :param level: The level (e.g., logging.DEBUG).
+    :param event: The event name (e.g., "message").
+    :param fields: The event's fields.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"event": event, "fields": fields})
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as `time level logger message key=value ...`."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only every Nth record of high-volume events. Rates map an event
+    name to the share of records to keep (e.g., 0.01 keeps 1 in 100);
+    records of other events always pass.
+    """
+
+    def __init__(self, rates):
+        """
+        :param rates: Mapping of event name to sampling rate (0 to 1).
+        """
+        super().__init__()
+        self.every = {event: max(1, round(1 / rate)) for event, rate in rates.items() if rate > 0}
+        self.dropped = {event for event, rate in rates.items() if rate <= 0}
+        self.counts = dict.fromkeys(self.every, 0)
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event in self.dropped:
+            return False
+        every = self.every.get(event)
+        if every is None:
+            return True
+        self.counts[event] += 1
+        return self.counts[event] % every == 1 or every == 1
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent formatted log lines in memory."""
+
+    def __init__(self, capacity=1000):
+        """
+        :param capacity: The number of lines to keep.
+        """
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+
+    def emit(self, record):
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def tail(self, count):
+        """The last `count` lines, oldest first."""
+        return list(self.lines)[-count:] if count > 0 else []
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted, leaving all formatting to the listener."""
+
+    def prepare(self, record):
+        return record
+
+
+class LogService:
+    """
+    The bot's logging pipeline. Loggers only sample records and put them on
+    a queue; a listener thread formats and writes them to stderr and to an
+    in-memory ring buffer that owner commands can read.
+    """
+
+    def __init__(self, level="INFO", sample_rates=None, buffer_size=1000):
+        """
+        :param level: The minimum level logged.
+        :param sample_rates: Mapping of event name to sampling rate.
+        :param buffer_size: Lines kept in the ring buffer.
+        """
+        formatter = StructuredFormatter()
+        sampler = SamplingFilter(sample_rates or {})
+
+        self.buffer = RingBufferHandler(buffer_size)
+        stream = logging.StreamHandler(sys.stderr)
+        for handler in (self.buffer, stream):
+            handler.setFormatter(formatter)
+
+        self._queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(
+            self._queue, self.buffer, stream, respect_handler_level=True)
+
+        self.logger = get_logger()
+        self.logger.setLevel(level)
+        self.logger.propagate = False
+        handler = _DeferredQueueHandler(self._queue)
+        # Sampled before queueing, so dropped events never reach the listener
+        handler.addFilter(sampler)
+        self.logger.handlers[:] = [handler]
+        self.sampler = sampler
+
+    def start(self):
+        """Start the listener thread."""
+        self.listener.start()
+
+    def stop(self):
+        """Write out queued records and stop the listener thread."""
+        self.listener.stop()
+
+    def set_level(self, level):
+        """Change the minimum level, e.g. "DEBUG" to see every event."""
+        self.logger.setLevel(level)
+
+
+def setup_logging(config):
+    """
+    Build and start the logging pipeline from the optional settings.
+    :param config: The bot's config module.
+    :return: The running `LogService`.
+    """
+    service = LogService(
+        level=getattr(config, "LOG_LEVEL", "INFO"),
+        sample_rates=getattr(config, "LOG_SAMPLE_RATES", {"message": 0.01}),
+        buffer_size=getattr(config, "LOG_BUFFER_SIZE", 1000),
+    )
+    service.start()
+    return service
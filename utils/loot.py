@@ -0,0 +1,126 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import random
+from utils.log import get_logger
+
+
+_system_random = random.SystemRandom()
+log = get_logger("loot")
+
+
+class LootTable:
+    """
+    A loot table compiled into a Vose alias table, so each draw costs O(1)
+    whatever the number of entries. Weights are kept as integers
+    throughout, so draws follow the configured weights exactly.
+    """
+
+    def __init__(self, entries):
+        """
+        :param entries: List of loot dicts, each with an integer "weight".
+        :raises ValueError: If the table is empty or has no positive weight.
+        """
+        weights = [int(entry["weight"]) for entry in entries]
+        if not weights or min(weights) < 0 or sum(weights) == 0:
+            raise ValueError("A loot table needs at least one entry with a positive weight.")
+        self.entries = list(entries)
+        self.total = sum(weights)
+
+        # Scale each weight by n so the average column holds exactly `total`
+        n = len(weights)
+        scaled = [weight * n for weight in weights]
+        self._threshold = [self.total] * n
+        self._alias = list(range(n))
+        small = [i for i, weight in enumerate(scaled) if weight < self.total]
+        large = [i for i, weight in enumerate(scaled) if weight >= self.total]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self._threshold[low] = scaled[low]
+            self._alias[low] = high
+            scaled[high] -= self.total - scaled[low]
+            (small if scaled[high] < self.total else large).append(high)
+        # Whatever is left fills its column completely
+
+    def __len__(self):
+        return len(self.entries)
+
+    def draw(self, rng=_system_random):
+        """
+        Pick one entry at random, with probability weight / total.
+        :param rng: Source of randomness providing `randrange`.
+        :return: The chosen entry dict.
+        """
+        column, position = divmod(rng.randrange(len(self.entries) * self.total), self.total)
+        if position < self._threshold[column]:
+            return self.entries[column]
+        return self.entries[self._alias[column]]
+
+    def sample(self, count, rng=_system_random):
+        """
+        Draw several entries independently (with replacement).
+        :param count: The number of draws.
+        :param rng: Source of randomness providing `randrange`.
+        :return: List of chosen entry dicts.
+        """
+        draw = self.draw
+        return [draw(rng) for _ in range(count)]
+
+
+class LootEngine:
+    """
+    Compiles loot tables on first use and keeps them until the loaded table
+    data changes. A compiled table is reused as long as its source list is
+    the one currently loaded, so reloading the loot tables invalidates it.
+    """
+
+    def __init__(self, manager):
+        """
+        :param manager: The `BotManager` holding the raw loot tables.
+        """
+        self.manager = manager
+        self._compiled = {}
+
+    def table(self, table_name):
+        """
+        The compiled loot table for a name.
+        :param table_name: The table's name (e.g., "fishing").
+        :return: A `LootTable`, or None if the table is missing or empty.
+        """
+        source = self.manager.get_loot_table(table_name)
+        cached = self._compiled.get(table_name)
+        # A missing table comes back as a new empty list each time, so any
+        # empty source matches a cached empty one
+        if cached is not None and (cached[0] is source or not (cached[0] or source)):
+            return cached[1]
+        try:
+            compiled = LootTable(source)
+        except (ValueError, KeyError, TypeError):
+            log.warning("Loot table '%s' is missing or has invalid weights.", table_name)
+            compiled = None
+        self._compiled[table_name] = (source, compiled)
+        return compiled
+
+    def invalidate(self, table_name=None):
+        """
+        Drop compiled tables after the raw data was edited in place.
+        :param table_name: The table to drop (all if omitted).
+        """
+        if table_name is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(table_name, None)
@@ -0,0 +1,173 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from collections import deque
+import discord
+from utils.log import get_logger
+
+log = get_logger("outbox")
+
+# Discord's message length limit
+MESSAGE_LIMIT = 2000
+
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """
+    Split text into messages within the length limit, preferring to break
+    between lines.
+    :param text: The text to send.
+    :param limit: The maximum length of each message.
+    :return: List of message strings.
+    """
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class _ChannelQueue:
+    """Pending notices of one channel, and the replies being sent to it."""
+
+    __slots__ = ("channel", "notices", "task", "replies", "idle")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.notices = deque()
+        self.task = None
+        # Replies being sent; notices wait for `idle` while there are any
+        self.replies = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def __len__(self):
+        return len(self.notices)
+
+
+class Outbox:
+    """
+    Sends the bot's messages per channel in two lanes, so bursts of
+    informational notices (e.g., AFK messages) do not eat into the channel's
+    rate limit ahead of command replies. Notices queued within `window`
+    seconds are merged into as few messages as the length limit allows.
+    Replies are sent at once, and while any reply to a channel is being
+    sent, its notices wait, so replies never queue behind them for the
+    channel's rate limit.
+    Each channel is served by one worker task that exits once it is idle.
+    """
+
+    def __init__(self, window=1.0):
+        """
+        :param window: Seconds to wait for more notices before sending.
+        """
+        self.window = window
+        self._channels = {}
+        self.stats = {"queued": 0, "sent": 0, "merged": 0, "failed": 0, "peak_depth": 0, "replies": 0}
+
+    def depth(self, channel_id=None):
+        """
+        The number of notices waiting to be sent.
+        :param channel_id: A single channel to count (all if omitted).
+        """
+        if channel_id is not None:
+            queue = self._channels.get(channel_id)
+            return len(queue) if queue else 0
+        return sum(len(queue) for queue in self._channels.values())
+
+    def busiest(self, count=5):
+        """The channels with the most waiting notices, as (channel ID, depth) pairs."""
+        depths = sorted(((len(queue), channel_id) for channel_id, queue in self._channels.items()), reverse=True)
+        return [(channel_id, depth) for depth, channel_id in depths[:count]]
+
+    def notice(self, channel, text):
+        """Queue an informational message, to be merged with other notices."""
+        queue = self._queue(channel)
+        queue.notices.append(text)
+        self.stats["queued"] += 1
+        self.stats["peak_depth"] = max(self.stats["peak_depth"], len(queue))
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.get_running_loop().create_task(self._serve(channel.id, queue))
+
+    async def reply(self, channel, send):
+        """
+        Send a command reply in the priority lane: the channel's notices
+        wait until it has been sent.
+        :param channel: The channel the reply goes to.
+        :param send: The coroutine sending it (e.g., from `Context.send`).
+        :return: Whatever `send` returns.
+        """
+        queue = self._queue(channel)
+        queue.replies += 1
+        queue.idle.clear()
+        self.stats["replies"] += 1
+        try:
+            return await send
+        finally:
+            queue.replies -= 1
+            if not queue.replies:
+                queue.idle.set()
+                if not len(queue) and (queue.task is None or queue.task.done()):
+                    self._release(channel.id, queue)
+
+    def _queue(self, channel):
+        """The channel's queue, created on first use."""
+        queue = self._channels.get(channel.id)
+        if queue is None:
+            queue = self._channels[channel.id] = _ChannelQueue(channel)
+        return queue
+
+    def _release(self, channel_id, queue):
+        """Forget a channel's queue once nothing is waiting or being sent."""
+        if self._channels.get(channel_id) is queue and not len(queue) and not queue.replies:
+            del self._channels[channel_id]
+
+    async def _serve(self, channel_id, queue):
+        """Send a channel's queued notices until it has none left."""
+        notices = queue.notices
+        try:
+            while notices:
+                # Give other notices the window to arrive, and replies their turn
+                await asyncio.sleep(self.window)
+                await queue.idle.wait()
+                batch = [notices.popleft() for _ in range(len(notices))]
+                self.stats["merged"] += len(batch) - 1
+                for chunk in split_message("\n".join(batch)):
+                    await queue.idle.wait()
+                    await self._send(queue.channel, chunk)
+        finally:
+            self._release(channel_id, queue)
+
+    async def _send(self, channel, text):
+        try:
+            await channel.send(text)
+            self.stats["sent"] += 1
+        except discord.HTTPException as e:
+            self.stats["failed"] += 1
+            log.warning("Failed to send to channel %s: %s", channel.id, e)
@@ -0,0 +1,157 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from bisect import bisect_left, insort
+
+
+class RankIndex:
+    """
+    A sorted multiset of integer keys with order-statistic queries.
+    Keys are kept in sorted buckets of bounded size, and a Fenwick tree over
+    the bucket sizes turns "how many keys come before this one" and "which
+    key is at position i" into O(log n) lookups. Inserts and removals only
+    shift items within a single bucket.
+    """
+
+    BUCKET_SIZE = 512
+
+    def __init__(self, keys=()):
+        """
+        :param keys: Initial keys, in any order.
+        """
+        keys = sorted(keys)
+        size = self.BUCKET_SIZE
+        self._buckets = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._tree = None
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        """Insert a key."""
+        self._len += 1
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._tree = None
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._buckets[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._buckets[i], key)
+
+        bucket = self._buckets[i]
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            # Split an overgrown bucket in two
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._tree = None
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        """
+        Remove one occurrence of a key.
+        :raises KeyError: If the key is not in the index.
+        """
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            raise KeyError(key)
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._tree = None
+
+    def rank(self, key):
+        """The number of keys smaller than `key`."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._buckets[i], key)
+
+    def slice(self, start, stop):
+        """
+        The keys at sorted positions `start` to `stop` (exclusive).
+        Costs O(log n) to find `start`, then O(stop - start).
+        """
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return []
+        i, offset = self._locate(start)
+        keys = []
+        while len(keys) < stop - start:
+            keys.extend(self._buckets[i][offset:offset + stop - start - len(keys)])
+            i, offset = i + 1, 0
+        return keys
+
+    # Fenwick tree over bucket sizes, rebuilt lazily after buckets split or vanish
+    def _build_tree(self):
+        tree = [len(bucket) for bucket in self._buckets]
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i, delta):
+        tree = self._tree
+        if tree is None:
+            return
+        while i < len(tree):
+            tree[i] += delta
+            i |= i + 1
+
+    def _prefix(self, i):
+        """Total size of the first `i` buckets."""
+        if self._tree is None:
+            self._build_tree()
+        total = 0
+        while i > 0:
+            total += self._tree[i - 1]
+            i &= i - 1
+        return total
+
+    def _locate(self, position):
+        """Find the bucket and offset holding the key at `position`."""
+        if self._tree is None:
+            self._build_tree()
+        tree = self._tree
+        i = 0
+        step = 1 << (len(tree).bit_length() - 1) if tree else 0
+        while step:
+            if i + step <= len(tree) and tree[i + step - 1] <= position:
+                i += step
+                position -= tree[i - 1]
+            step >>= 1
+        return i, position
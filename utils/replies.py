@@ -0,0 +1,130 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+
+class _Waiter:
+    """One pending prompt: who may answer, with what, and by when."""
+
+    __slots__ = ("key", "choices", "deadline", "future")
+
+    def __init__(self, key, choices, deadline, future):
+        self.key = key
+        self.choices = choices
+        self.deadline = deadline
+        self.future = future
+
+
+class ReplyRouter:
+    """
+    Routes replies to pending prompts (e.g., "heads or tails?").
+    Prompts are keyed by (channel ID, user ID), so each incoming message is
+    matched with one dict lookup instead of running every pending check.
+    Several prompts for the same user and channel are answered in order.
+    All timeouts share one heap and one timer.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        # Entries are (deadline, sequence, waiter); answered waiters are
+        # skipped when their entry comes up.
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._timer = None
+
+    def __len__(self):
+        return sum(len(waiters) for waiters in self._pending.values())
+
+    async def wait_for(self, channel_id, user_id, choices, timeout):
+        """
+        Wait for a user to answer a prompt in a channel.
+        :param channel_id: The channel the prompt was sent in.
+        :param user_id: The user expected to answer.
+        :param choices: The accepted answers, in lowercase.
+        :param timeout: Seconds to wait before giving up.
+        :return: The answer, in lowercase.
+        :raises asyncio.TimeoutError: If no accepted answer arrives in time.
+        """
+        key = (channel_id, user_id)
+        waiter = _Waiter(key, frozenset(choices), time.time() + timeout,
+                         asyncio.get_running_loop().create_future())
+        self._pending.setdefault(key, deque()).append(waiter)
+        heapq.heappush(self._deadlines, (waiter.deadline, next(self._sequence), waiter))
+        if self._deadlines[0][2] is waiter:
+            self._arm()
+        try:
+            return await waiter.future
+        finally:
+            # Also covers the caller being cancelled
+            self._discard(waiter)
+
+    def dispatch(self, message):
+        """
+        Offer an incoming message to the prompts waiting on its author.
+        :param message: The `discord.Message` received.
+        :return: True if the message answered a prompt.
+        """
+        waiters = self._pending.get((message.channel.id, message.author.id))
+        if not waiters:
+            return False
+        answer = message.content.strip().lower()
+        for waiter in waiters:
+            if answer in waiter.choices and not waiter.future.done():
+                waiter.future.set_result(answer)
+                self._discard(waiter)
+                return True
+        return False
+
+    def _discard(self, waiter):
+        """Stop routing replies to a waiter."""
+        waiters = self._pending.get(waiter.key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del self._pending[waiter.key]
+
+    def _arm(self):
+        """Point the timer at the earliest deadline."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._deadlines:
+            delay = max(0.0, self._deadlines[0][0] - time.time())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._expire)
+
+    def _expire(self):
+        """Time out every prompt past its deadline, then re-arm the timer."""
+        self._timer = None
+        now = time.time()
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, waiter = heapq.heappop(self._deadlines)
+            if not waiter.future.done():
+                waiter.future.set_exception(asyncio.TimeoutError())
+                self._discard(waiter)
+        # Drop answered waiters at the front so the timer is not woken for them
+        while self._deadlines and self._deadlines[0][2].future.done():
+            heapq.heappop(self._deadlines)
+        self._arm()
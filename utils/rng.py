@@ -0,0 +1,124 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import random
+import sys
+import time
+
+
+def _system_bytes(count):
+    """Cryptographic random bytes; Crypto is only imported on the first refill."""
+    from Crypto.Random import get_random_bytes
+    return get_random_bytes(count)
+
+
+class EntropyPool:
+    """
+    Random numbers for game rolls, served from a buffer of cryptographic
+    bytes fetched in large blocks, so most rolls never touch the OS CSPRNG.
+    Bounded integers use rejection sampling and are exactly uniform.
+    Given a seed, the pool is filled from a deterministic generator instead,
+    for reproducible benchmarks and tests; never seed it in production.
+    Offers the subset of the `random` API the bot uses.
+    """
+
+    def __init__(self, block_size=4096, seed=None):
+        """
+        :param block_size: Number of bytes fetched per refill.
+        :param seed: Seed for deterministic mode, or None for real entropy.
+        """
+        self.block_size = block_size
+        self._source = _system_bytes if seed is None else random.Random(seed).randbytes
+        self._buffer = b""
+        self._offset = 0
+
+    def _take(self, count):
+        """Return the next `count` bytes of the pool, refilling it as needed."""
+        end = self._offset + count
+        if end > len(self._buffer):
+            self._buffer = self._buffer[self._offset:] + self._source(max(self.block_size, count))
+            self._offset, end = 0, count
+        chunk = self._buffer[self._offset:end]
+        self._offset = end
+        return chunk
+
+    def getrandbits(self, k):
+        """A random integer with `k` random bits."""
+        if k <= 0:
+            return 0
+        if k <= 8:
+            # Fast path for coin flips and dice: one byte, no slicing
+            if self._offset >= len(self._buffer):
+                self._buffer, self._offset = self._source(self.block_size), 0
+            value = self._buffer[self._offset]
+            self._offset += 1
+            return value >> (8 - k)
+        nbytes = (k + 7) // 8
+        return int.from_bytes(self._take(nbytes), "little") >> (nbytes * 8 - k)
+
+    def randbelow(self, n):
+        """A uniform random integer in [0, n)."""
+        if n <= 0:
+            raise ValueError("randbelow() needs a positive bound.")
+        k = n.bit_length()
+        while True:
+            # Accepts with probability over 1/2, so this rarely loops
+            value = self.getrandbits(k)
+            if value < n:
+                return value
+
+    def randrange(self, start, stop=None):
+        """A uniform random integer in [start, stop), or [0, start) if `stop` is omitted."""
+        if stop is None:
+            start, stop = 0, start
+        if stop <= start:
+            raise ValueError("Empty range for randrange().")
+        return start + self.randbelow(stop - start)
+
+    def randint(self, a, b):
+        """A uniform random integer in [a, b], both included."""
+        return self.randrange(a, b + 1)
+
+    def choice(self, seq):
+        """A uniformly chosen element of a non-empty sequence."""
+        return seq[self.randbelow(len(seq))]
+
+
+def benchmark(rolls=200000):
+    """
+    Compare the per-roll cost of `Crypto.Random.random` with the pool.
+    :param rolls: The number of rolls to time per case.
+    """
+    from Crypto.Random import random as crypto_random
+
+    cases = [
+        ("Crypto.Random.random", crypto_random),
+        ("EntropyPool", EntropyPool()),
+        ("EntropyPool (seeded)", EntropyPool(seed=0)),
+    ]
+    for name, rng in cases:
+        for roll, call in (("getrandbits(1)", lambda: rng.getrandbits(1)), ("randint(1, 6)", lambda: rng.randint(1, 6))):
+            start = time.perf_counter()
+            for _ in range(rolls):
+                call()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<22} {roll:<15} {elapsed / rolls * 1e9:8.0f} ns/roll")
+
+
+if __name__ == "__main__":
+    # python -m utils.rng [rolls]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,235 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+import struct
+import sys
+import time
+import numpy as np
+from collections.abc import MutableMapping
+
+
+# File layout: a header, then one fixed-width record per account sorted by
+# user ID. Header: magic, format version, record size, record count.
+HEADER = struct.Struct("<4sHHQ")
+MAGIC = b"VBCS"
+VERSION = 1
+
+# Record: user ID, wallet, bank, then one timestamp per field below.
+TIMESTAMP_FIELDS = (
+    "last_interest_time",
+    "last_daily",
+    "last_weekly",
+    "last_monthly",
+    "last_beg",
+    "last_bankruptcy",
+    "last_fish",
+)
+RECORD = struct.Struct("<Qqq" + "d" * len(TIMESTAMP_FIELDS))
+FIELDS = ("wallet", "bank") + TIMESTAMP_FIELDS
+# The same record layout as a NumPy dtype, for reading whole files at once
+RECORD_DTYPE = np.dtype([("user_id", "<u8"), ("wallet", "<i8"), ("bank", "<i8")]
+                        + [(field, "<f8") for field in TIMESTAMP_FIELDS])
+
+
+class CurrencyRecords(MutableMapping):
+    """
+    The accounts of a binary snapshot, held as one NumPy structured array
+    read straight from the file instead of a dict per account, so
+    `BalanceStore` can load them a whole column at a time.
+    It is also a mutable mapping of user ID string to account dict: changes
+    (e.g., replayed from the journal) go to a small overlay on top of the
+    records, and other backends can still copy it row by row.
+    """
+
+    def __init__(self, records):
+        """
+        :param records: Array of `RECORD_DTYPE`, sorted by user ID.
+        """
+        self.records = records
+        self.overlay = {}
+        self.deleted = set()
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a snapshot file.
+        :param path: Path of the snapshot file.
+        :raises ValueError: If the file is not a complete currency snapshot.
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a version {VERSION} currency snapshot.")
+        magic, version, record_size, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a version {VERSION} currency snapshot.")
+        if len(data) < HEADER.size + count * RECORD.size:
+            raise ValueError(f"{path} is truncated.")
+        return cls(np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER.size))
+
+    def _position(self, user_id):
+        """The index of a user's record, or None if they have none."""
+        try:
+            user_id = int(user_id)
+        except ValueError:
+            return None
+        ids = self.records["user_id"]
+        i = int(np.searchsorted(ids, user_id))
+        return i if i < len(ids) and ids[i] == user_id else None
+
+    def __getitem__(self, user_id):
+        if user_id in self.overlay:
+            return self.overlay[user_id]
+        i = None if user_id in self.deleted else self._position(user_id)
+        if i is None:
+            raise KeyError(user_id)
+        return dict(zip(FIELDS, self.records[i].item()[1:]))
+
+    def __setitem__(self, user_id, data):
+        self.overlay[user_id] = data
+        self.deleted.discard(user_id)
+
+    def __delitem__(self, user_id):
+        if user_id not in self:
+            raise KeyError(user_id)
+        self.overlay.pop(user_id, None)
+        if self._position(user_id) is not None:
+            self.deleted.add(user_id)
+
+    def _shadowed(self):
+        """User IDs of records replaced or deleted by the overlay."""
+        return [int(user_id) for user_id in self.deleted | self.overlay.keys()
+                if self._position(user_id) is not None]
+
+    def __iter__(self):
+        """Yield user IDs: the records' in ID order, then the overlay's."""
+        skip = self.deleted | self.overlay.keys()
+        for user_id in self.records["user_id"].tolist():
+            if str(user_id) not in skip:
+                yield str(user_id)
+        yield from self.overlay
+
+    def __len__(self):
+        return len(self.records) - len(self._shadowed()) + len(self.overlay)
+
+    def update(self, other=(), **kwargs):
+        """Merge another snapshot (e.g., another shard) without decoding it."""
+        if not isinstance(other, CurrencyRecords) or kwargs:
+            super().update(other, **kwargs)
+            return
+        records = np.concatenate([self.records, other.records])
+        self.records = records[np.argsort(records["user_id"], kind="stable")]
+        for user_id in other.deleted:
+            self.pop(user_id, None)
+        for user_id, data in other.overlay.items():
+            self[user_id] = data
+
+    def to_columns(self):
+        """
+        The accounts as whole columns, with the overlay applied.
+        :return: `(ids, columns)`: an array of user IDs and a mapping of
+            field to an array of its values, in the same order.
+        """
+        records = self.records
+        shadowed = self._shadowed()
+        if shadowed:
+            records = records[~np.isin(records["user_id"], np.array(shadowed, dtype=np.uint64))]
+        extra = list(self.overlay.items())
+        ids = np.concatenate([
+            records["user_id"].astype(np.int64),
+            np.array([int(user_id) for user_id, _ in extra], dtype=np.int64),
+        ])
+        columns = {
+            field: np.concatenate([
+                records[field],
+                np.array([data.get(field, 0) for _, data in extra], dtype=RECORD_DTYPE[field]),
+            ])
+            for field in FIELDS
+        }
+        return ids, columns
+
+
+def read_snapshot(path):
+    """
+    Load a binary snapshot.
+    :param path: Path of the snapshot file.
+    :return: The accounts, as `CurrencyRecords`.
+    """
+    return CurrencyRecords.read(path)
+
+
+def write_snapshot(path, currency_data):
+    """
+    Atomically write currency data as a binary snapshot. Only the wallet,
+    bank and timestamp fields are kept. Unset cooldowns are stored as 0, and
+    accounts without a `last_interest_time` start accruing interest now.
+    :param path: Path of the snapshot file.
+    :param currency_data: Mapping of user ID to account data.
+    """
+    records = sorted(currency_data.items(), key=lambda item: int(item[0]))
+    buffer = bytearray(HEADER.size + len(records) * RECORD.size)
+    HEADER.pack_into(buffer, 0, MAGIC, VERSION, RECORD.size, len(records))
+    offset = HEADER.size
+    now = time.time()
+    for user_id, data in records:
+        RECORD.pack_into(
+            buffer, offset, int(user_id),
+            int(data.get("wallet", 0)), int(data.get("bank", 0)),
+            float(data.get("last_interest_time", now)),
+            *(float(data.get(field, 0)) for field in TIMESTAMP_FIELDS[1:]),
+        )
+        offset += RECORD.size
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(buffer)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def json_to_binary(json_path, binary_path):
+    """
+    Convert a JSON currency file into a binary snapshot.
+    :param json_path: The source `currency.json`.
+    :param binary_path: The snapshot to write.
+    """
+    with open(json_path, "r") as file:
+        write_snapshot(binary_path, json.load(file))
+
+
+def binary_to_json(binary_path, json_path):
+    """
+    Convert a binary snapshot back into a JSON currency file.
+    :param binary_path: The source snapshot.
+    :param json_path: The JSON file to write.
+    """
+    data = dict(read_snapshot(binary_path))
+    with open(json_path, "w") as file:
+        json.dump(data, file, indent=4)
+
+
+if __name__ == "__main__":
+    # python -m utils.snapshot to-binary data/currency.json data/currency.bin
+    # python -m utils.snapshot to-json data/currency.bin data/currency.json
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-binary", "to-json"):
+        print("Usage: python -m utils.snapshot {to-binary|to-json} <source> <destination>")
+        sys.exit(1)
+    convert = json_to_binary if sys.argv[1] == "to-binary" else binary_to_json
+    convert(sys.argv[2], sys.argv[3])
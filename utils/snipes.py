@@ -0,0 +1,147 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict, deque
+
+
+def _record_size(record):
+    """Approximate memory held by a record tuple and the values in it."""
+    return sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record)
+
+
+class SnipeStore:
+    """
+    Recently deleted or edited messages, for snipe commands.
+    Each channel keeps a ring of its latest records, stored as plain tuples
+    `(timestamp, author_id, *texts)`. Records older than `max_age` are
+    dropped when read and by a background sweep that runs only while the
+    store holds anything. Memory use is capped by `byte_budget` across all
+    guilds: when it is exceeded, the least recently active guilds are
+    evicted first.
+    """
+
+    def __init__(self, max_age=900, per_channel=50, byte_budget=4 * 1024 * 1024, sweep_interval=300):
+        """
+        :param max_age: Seconds a record stays snipeable.
+        :param per_channel: Records kept per channel.
+        :param byte_budget: Approximate memory limit for all records.
+        :param sweep_interval: Seconds between sweeps for expired records.
+        """
+        self.max_age = max_age
+        self.per_channel = per_channel
+        self.byte_budget = byte_budget
+        self.sweep_interval = sweep_interval
+        self.bytes = 0
+        # guild ID -> {channel ID -> deque of records}, least recently active first
+        self._guilds = OrderedDict()
+        self._sweeper = None
+
+    def __len__(self):
+        return sum(len(ring) for channels in self._guilds.values() for ring in channels.values())
+
+    def add(self, guild_id, channel_id, author_id, *texts):
+        """
+        Record a message.
+        :param guild_id: The message's guild.
+        :param channel_id: The message's channel.
+        :param author_id: The message's author.
+        :param texts: The text to keep (e.g., the content, or old and new content).
+        """
+        record = (time.time(), author_id) + texts
+        channels = self._guilds.get(guild_id)
+        if channels is None:
+            channels = self._guilds[guild_id] = {}
+        else:
+            self._guilds.move_to_end(guild_id)
+        ring = channels.get(channel_id)
+        if ring is None:
+            ring = channels[channel_id] = deque()
+        if len(ring) >= self.per_channel:
+            self.bytes -= _record_size(ring.popleft())
+        ring.append(record)
+        self.bytes += _record_size(record)
+
+        self._enforce_budget(guild_id, ring)
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_while_used())
+
+    def pop(self, guild_id, channel_id):
+        """
+        Take the latest record of a channel that has not expired.
+        :return: The record tuple, or None if there is none.
+        """
+        channels = self._guilds.get(guild_id)
+        ring = channels.get(channel_id) if channels else None
+        if not ring:
+            return None
+        self._expire(ring, time.time() - self.max_age)
+        if not ring:
+            self._drop_channel(guild_id, channel_id)
+            return None
+        record = ring.pop()
+        self.bytes -= _record_size(record)
+        if not ring:
+            self._drop_channel(guild_id, channel_id)
+        return record
+
+    def clear(self, guild_id):
+        """Forget every record of a guild."""
+        channels = self._guilds.pop(guild_id, None)
+        if channels:
+            self.bytes -= sum(_record_size(record) for ring in channels.values() for record in ring)
+
+    def sweep(self):
+        """Drop expired records and the channels and guilds left empty."""
+        cutoff = time.time() - self.max_age
+        for guild_id, channels in list(self._guilds.items()):
+            for channel_id, ring in list(channels.items()):
+                self._expire(ring, cutoff)
+                if not ring:
+                    del channels[channel_id]
+            if not channels:
+                del self._guilds[guild_id]
+
+    def _expire(self, ring, cutoff):
+        """Drop records older than `cutoff` from the front of a ring."""
+        while ring and ring[0][0] < cutoff:
+            self.bytes -= _record_size(ring.popleft())
+
+    def _drop_channel(self, guild_id, channel_id):
+        """Remove an empty channel, and its guild if that was the last one."""
+        channels = self._guilds[guild_id]
+        del channels[channel_id]
+        if not channels:
+            del self._guilds[guild_id]
+
+    def _enforce_budget(self, guild_id, ring):
+        """Evict whole idle guilds, then the oldest local records, until within budget."""
+        while self.bytes > self.byte_budget and len(self._guilds) > 1:
+            oldest = next(iter(self._guilds))
+            if oldest == guild_id:
+                break
+            self.clear(oldest)
+        while self.bytes > self.byte_budget and len(ring) > 1:
+            self.bytes -= _record_size(ring.popleft())
+
+    async def _sweep_while_used(self):
+        """Sweep periodically, stopping once the store is empty."""
+        while self._guilds:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
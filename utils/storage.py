@@ -0,0 +1,426 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from utils.journal import JournaledStorage
+from utils.snapshot import read_snapshot, write_snapshot
+
+
+# Datasets that hold one row per user (or per top-level key) and can be
+# stored row by row. Everything else (shop, loot tables, ...) stays in JSON.
+ROW_DATASETS = ("currency", "inventory", "summons", "users")
+# Datasets that can be split over several files by user ID.
+SHARDED_DATASETS = ("currency", "inventory", "summons")
+# Datasets that can be stored as a binary snapshot instead of JSON.
+BINARY_DATASETS = ("currency",)
+DEFAULT_SQLITE_PATH = "data/voicebot.db"
+
+
+class JsonStorage:
+    """
+    Stores each dataset as one JSON file, or as a binary snapshot for
+    datasets listed in `binary_files` (currency only).
+    With `shards` > 1, the per-user datasets are split over that many files
+    by a hash of the user ID, and a save only rewrites the shards that hold
+    changed rows.
+    """
+
+    def __init__(self, data_files, binary_files=None, shards=1):
+        """
+        :param data_files: Mapping of dataset key to JSON file path.
+        :param binary_files: Mapping of dataset key to binary snapshot path.
+        :param shards: Number of files to split each sharded dataset into.
+        """
+        self.data_files = data_files
+        self.binary_files = binary_files or {}
+        self.shards = shards
+        # Datasets whose files on disk do not match the configured layout
+        # (shard count or format); their next save rewrites every file and
+        # removes stale ones.
+        self._relayout = set()
+        # Dataset key -> {shard -> row keys stored in it}, as last read or
+        # written, so a flush can find a shard's rows without rehashing
+        self._members = {}
+
+    def load(self, key):
+        """
+        Read a dataset from disk, whatever layout it was written in: shard
+        files are merged whatever shard count they were written with, and a
+        dataset stored in the other format (JSON or binary) is read from
+        that. If both formats are on disk, the newer files win. Either way
+        the next save rewrites it in the configured layout and removes the
+        old files.
+        :param key: The identifier for the data (e.g., "currency").
+        :return: The stored dict.
+        :raises FileNotFoundError, json.JSONDecodeError: If nothing valid is stored.
+        """
+        stored = self._stored_files(key)
+        if not stored:
+            raise FileNotFoundError(f"No {key} data stored at {self._path(key)}.")
+        binary, files = max(
+            stored.items(), key=lambda item: max(os.path.getmtime(path) for path in item[1].values()))
+        layout = set(range(self.shards)) if self._is_sharded(key) else {None}
+        if len(stored) > 1 or binary != (key in self.binary_files) or set(files) != layout:
+            self._relayout.add(key)
+
+        shards = {shard: self._read(path, binary) for shard, path in files.items()}
+        if key not in self._relayout and self._is_sharded(key):
+            self._members[key] = {shard: set(rows) for shard, rows in shards.items()}
+        data, *others = shards.values()
+        for other in others:
+            data.update(other)
+        return data
+
+    def save(self, key, data, rows=None):
+        """
+        Atomically write a dataset: dump to a temp file, then rename it over
+        the real file so a crash never leaves a truncated data file behind.
+        :param key: The identifier for the data (e.g., "currency").
+        :param data: The full dataset, or every row of the changed shards.
+        :param rows: Changed row keys. Unsharded files are rewritten whole.
+        """
+        if not self._is_sharded(key):
+            self._write(key, self._path(key), data)
+            if key in self._relayout:
+                self._remove_stale(key)
+            return
+
+        if rows is None or key in self._relayout:
+            shards = range(self.shards)
+        else:
+            shards = {self.shard_of(row) for row in rows}
+        buckets = {shard: {} for shard in shards}
+        for row, value in data.items():
+            bucket = buckets.get(self.shard_of(row))
+            if bucket is not None:
+                bucket[row] = value
+        for shard, bucket in buckets.items():
+            self._write(key, self._shard_path(key, shard), bucket)
+        members = self._members.setdefault(key, {})
+        members.update((shard, set(bucket)) for shard, bucket in buckets.items())
+        if key in self._relayout:
+            self._remove_stale(key)
+
+    def rows_to_snapshot(self, key, row_keys, rows):
+        """
+        Pick the rows `save` needs to see: every row of the shards holding a
+        changed row. Only the changed rows are hashed; the rest of each
+        shard comes from the membership recorded by the last load or save.
+        :param key: The identifier for the data (e.g., "currency").
+        :param row_keys: Every row key of the live dataset (unused here).
+        :param rows: Changed row keys, or None for the whole dataset.
+        :return: The row keys to snapshot, or None for all of them.
+        """
+        if not self._is_sharded(key) or rows is None or key in self._relayout:
+            return None
+        members = self._members.get(key, {})
+        needed = set(rows)
+        for shard in {self.shard_of(row) for row in rows}:
+            needed |= members.get(shard, set())
+        return needed
+
+    def shard_of(self, row):
+        """
+        The shard a row lives in. crc32 is used rather than hash() because
+        it is stable across restarts.
+        :param row: The row key (a user ID string).
+        """
+        return zlib.crc32(row.encode()) % self.shards
+
+    def _is_sharded(self, key):
+        return self.shards > 1 and key in SHARDED_DATASETS
+
+    def _path(self, key):
+        return self.binary_files.get(key) or self.data_files[key]
+
+    def _shard_path(self, key, shard):
+        base, extension = os.path.splitext(self._path(key))
+        return f"{base}.{shard}{extension}"
+
+    def _format_paths(self, key):
+        """Map binary (True) or JSON (False) to the file path of each format a dataset can use."""
+        paths = {False: self.data_files[key]}
+        if key in BINARY_DATASETS:
+            paths[True] = self.binary_files.get(key) or binary_path(self.data_files[key])
+        return paths
+
+    def _stored_files(self, key):
+        """
+        Find a dataset's files on disk, per format.
+        :return: Mapping of binary (True) or JSON (False) to {shard: path},
+            where the shard is None for an unsharded file. Shard files take
+            precedence over an unsharded file of the same format.
+        """
+        stored = {}
+        for binary, path in self._format_paths(key).items():
+            files = self._shard_files(key, path)
+            if not files and os.path.exists(path):
+                files = {None: path}
+            if files:
+                stored[binary] = files
+        return stored
+
+    def _shard_files(self, key, path):
+        """Map shard index to path for every shard file of a dataset on disk."""
+        if key not in SHARDED_DATASETS:
+            return {}
+        base, extension = os.path.splitext(path)
+        directory, prefix = os.path.split(base)
+        shard_files = {}
+        for name in os.listdir(directory or "."):
+            if name.startswith(prefix + ".") and name.endswith(extension):
+                index = name[len(prefix) + 1:len(name) - len(extension)]
+                if index.isdigit():
+                    shard_files[int(index)] = os.path.join(directory, name)
+        return shard_files
+
+    def _remove_stale(self, key):
+        """Delete files left over from a previous layout or format of a dataset."""
+        if self._is_sharded(key):
+            keep = {self._shard_path(key, shard) for shard in range(self.shards)}
+        else:
+            keep = {self._path(key)}
+        for path in self._format_paths(key).values():
+            for stale in [path, *self._shard_files(key, path).values()]:
+                if stale not in keep and os.path.exists(stale):
+                    os.remove(stale)
+        self._relayout.discard(key)
+
+    def _read(self, path, binary):
+        if binary:
+            return read_snapshot(path)
+        with open(path, "r") as file:
+            return json.load(file)
+
+    def _write(self, key, path, data):
+        if key in self.binary_files:
+            write_snapshot(path, data)
+        else:
+            # Data read from a binary snapshot is not a dict yet
+            write_json_atomic(path, data if isinstance(data, dict) else dict(data))
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class SqliteStorage:
+    """
+    Stores per-user datasets in SQLite, one table per dataset with one row
+    per key, so saving a single user's change costs one upsert no matter how
+    many users there are. Other datasets are delegated to JSON files.
+    """
+
+    def __init__(self, db_path, data_files, datasets=ROW_DATASETS):
+        """
+        :param db_path: Path of the SQLite database file.
+        :param data_files: Mapping of dataset key to JSON file path, used for
+            datasets that are not stored in SQLite.
+        :param datasets: The dataset keys stored in SQLite.
+        """
+        self.datasets = set(datasets)
+        self.json = JsonStorage(data_files)
+        # The connection is shared by the I/O worker threads.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            for key in self.datasets:
+                self.connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{key}" '
+                    "(id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+                )
+
+    def load(self, key):
+        """
+        Read a dataset.
+        :param key: The identifier for the data (e.g., "currency").
+        :return: The stored dict.
+        """
+        if key not in self.datasets:
+            return self.json.load(key)
+        with self.lock:
+            rows = self.connection.execute(f'SELECT id, data FROM "{key}"').fetchall()
+        return {row_id: json.loads(data) for row_id, data in rows}
+
+    def save(self, key, data, rows=None):
+        """
+        Write a dataset.
+        :param key: The identifier for the data (e.g., "currency").
+        :param data: The dataset, or at least every changed row in it.
+        :param rows: Changed row keys. Rows missing from `data` are deleted.
+            If None, the whole table is replaced.
+        """
+        if key not in self.datasets:
+            self.json.save(key, data, rows)
+            return
+
+        if rows is None:
+            upserts = [(row_id, json.dumps(value)) for row_id, value in data.items()]
+            deletes = []
+        else:
+            upserts = [(row_id, json.dumps(data[row_id])) for row_id in rows if row_id in data]
+            deletes = [(row_id,) for row_id in rows if row_id not in data]
+
+        # The same SQL text is reused for every row, so sqlite3 compiles each
+        # statement once and keeps it in its statement cache.
+        with self.lock, self.connection:
+            if rows is None:
+                self.connection.execute(f'DELETE FROM "{key}"')
+            self.connection.executemany(
+                f'INSERT INTO "{key}" (id, data) VALUES (?, ?) '
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                upserts,
+            )
+            self.connection.executemany(f'DELETE FROM "{key}" WHERE id = ?', deletes)
+
+    def rows_to_snapshot(self, key, row_keys, rows):
+        """
+        Pick the rows `save` needs to see: only the changed ones.
+        :param key: The identifier for the data (e.g., "currency").
+        :param row_keys: Every row key of the live dataset.
+        :param rows: Changed row keys, or None for the whole dataset.
+        :return: The row keys to snapshot, or None for all of them.
+        """
+        if key not in self.datasets:
+            return self.json.rows_to_snapshot(key, row_keys, rows)
+        return rows
+
+    def close(self):
+        """Close the database connection."""
+        with self.lock:
+            self.connection.close()
+
+
+def copy_json(value):
+    """
+    Copy a tree of JSON-style dicts and lists, so it can be serialized on
+    another thread while the original keeps changing.
+    :param value: The value to copy.
+    """
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+def write_json_atomic(file_path, data):
+    """
+    Write JSON to a temp file, fsync it and rename it over `file_path`.
+    :param file_path: The destination file.
+    :param data: The JSON-serializable object to write.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def binary_path(json_path):
+    """
+    The binary snapshot path that goes with a JSON data file.
+    :param json_path: The JSON file path (e.g., "data/currency.json").
+    """
+    return os.path.splitext(json_path)[0] + ".bin"
+
+
+def create_storage(config, data_files):
+    """
+    Build the storage backend selected by `STORAGE_BACKEND` in config.py.
+    :param config: The config module.
+    :param data_files: Mapping of dataset key to JSON file path.
+    """
+    backend = getattr(config, "STORAGE_BACKEND", "json")
+    if backend == "sqlite":
+        return SqliteStorage(getattr(config, "SQLITE_PATH", DEFAULT_SQLITE_PATH), data_files)
+    if backend != "json":
+        print(f"Unknown STORAGE_BACKEND '{backend}'. Falling back to JSON.")
+    return create_json_storage(config, data_files)
+
+
+def create_json_storage(config, data_files):
+    """
+    Build the JSON backend with the binary, shard and journal settings in config.py.
+    :param config: The config module.
+    :param data_files: Mapping of dataset key to JSON file path.
+    """
+    binary_files = {}
+    if getattr(config, "CURRENCY_FORMAT", "json") == "binary":
+        binary_files["currency"] = binary_path(data_files["currency"])
+    # Always wrapped: with the journal turned off, one left from before is
+    # still replayed into the snapshot on load
+    return JournaledStorage(
+        JsonStorage(data_files, binary_files, getattr(config, "DATA_SHARDS", 1)),
+        journal_files(data_files),
+        getattr(config, "JOURNAL_COMPACT_RECORDS", 10000),
+        getattr(config, "CURRENCY_JOURNAL", True),
+    )
+
+
+def journal_files(data_files):
+    """
+    Journal paths for the journaled datasets, next to their JSON files.
+    :param data_files: Mapping of dataset key to JSON file path.
+    """
+    return {"currency": os.path.splitext(data_files["currency"])[0] + ".journal"}
+
+
+def migrate_json_to_sqlite(config, data_files, db_path, datasets=ROW_DATASETS):
+    """
+    Copy the per-user datasets from JSON storage into a SQLite database.
+    They are read with the configured JSON layout (binary currency
+    snapshot, shards, journal), so nothing stored that way is left behind.
+    Existing rows for those datasets are replaced.
+    :param config: The config module.
+    :param data_files: Mapping of dataset key to JSON file path.
+    :param db_path: Path of the SQLite database file.
+    :param datasets: The dataset keys to migrate.
+    """
+    source = create_json_storage(config, data_files)
+    target = SqliteStorage(db_path, data_files, datasets)
+    try:
+        for key in datasets:
+            try:
+                data = source.load(key)
+            except (FileNotFoundError, json.JSONDecodeError):
+                print(f"Skipping {key}: {data_files[key]} is missing or invalid.")
+                continue
+            target.save(key, data)
+            print(f"Migrated {len(data)} {key} rows.")
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    # One-shot migration: python -m utils.storage [db_path]
+    import config
+    from utils.helpers import bot_manager
+
+    migrate_json_to_sqlite(
+        config,
+        bot_manager.data_files,
+        sys.argv[1] if len(sys.argv) > 1 else getattr(config, "SQLITE_PATH", DEFAULT_SQLITE_PATH),
+    )
@@ -0,0 +1,163 @@
+# VoiceBot - Multifeature discord bot, made for Voicebox's Kingdom
+# Copyright (C) 2024  Jason Zhao
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+from utils.accounts import INT_FIELDS
+
+
+class InsufficientFunds(Exception):
+    """Raised when a transaction would take a balance below zero."""
+
+    def __init__(self, user_id, field, needed, available):
+        """
+        :param user_id: The user short on funds.
+        :param field: The balance checked ("wallet" or "bank").
+        :param needed: The amount the transaction needed.
+        :param available: The amount the user had.
+        """
+        super().__init__(f"User {user_id} needs {needed} coins in their {field} but has {available}.")
+        self.user_id = user_id
+        self.field = field
+        self.needed = needed
+        self.available = available
+
+
+class AccountLocks:
+    """
+    Striped locks for currency accounts. Each account hashes to one of a
+    fixed number of locks, so commands on unrelated accounts rarely wait on
+    each other and memory use does not grow with the number of users.
+    Multi-account holds take their locks in stripe order, which rules out
+    deadlocks between transactions touching the same accounts.
+    Locks are not reentrant: do not open a transaction on an account inside
+    another transaction holding it.
+    """
+
+    def __init__(self, stripes=256):
+        """
+        :param stripes: The number of locks to spread accounts over.
+        """
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    def stripes(self, user_ids):
+        """The sorted, de-duplicated lock indices covering these accounts."""
+        return sorted({hash(user_id) % len(self._locks) for user_id in user_ids})
+
+    async def acquire(self, user_ids):
+        """
+        Acquire the locks for a set of accounts, in stripe order.
+        :return: The acquired stripes, to pass to `release`.
+        """
+        acquired = []
+        try:
+            for stripe in self.stripes(user_ids):
+                await self._locks[stripe].acquire()
+                acquired.append(stripe)
+        except BaseException:
+            self.release(acquired)
+            raise
+        return acquired
+
+    def release(self, stripes):
+        """Release locks taken by `acquire`."""
+        for stripe in reversed(stripes):
+            self._locks[stripe].release()
+
+
+class Transaction:
+    """
+    An atomic change to one or more currency accounts.
+    Entering the transaction locks every participating account; balances are
+    then checked and changed against their current values, not values read
+    before the transaction began. If the block raises, every balance is put
+    back as it was; if it completes, the changed accounts are saved.
+
+        async with bot_manager.transaction(payer_id, payee_id) as txn:
+            txn.transfer(payer_id, payee_id, amount)
+    """
+
+    def __init__(self, manager, user_ids):
+        """
+        :param manager: The `BotManager` owning the accounts.
+        :param user_ids: Every account the transaction may touch.
+        """
+        self.manager = manager
+        self.user_ids = tuple(dict.fromkeys(user_ids))
+        self.accounts = {}
+        self._before = {}
+        self._stripes = None
+
+    async def __aenter__(self):
+        self._stripes = await self.manager.account_locks.acquire(self.user_ids)
+        for user_id in self.user_ids:
+            account = self.manager.get_account(user_id)
+            self.accounts[user_id] = account
+            self._before[user_id] = tuple(getattr(account, field) for field in INT_FIELDS)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            changed = [
+                user_id for user_id, account in self.accounts.items()
+                if tuple(getattr(account, field) for field in INT_FIELDS) != self._before[user_id]
+            ]
+            if exc_type is not None:
+                # Roll back so a failed transaction leaves no partial transfer
+                for user_id in changed:
+                    for field, value in zip(INT_FIELDS, self._before[user_id]):
+                        setattr(self.accounts[user_id], field, value)
+            elif changed:
+                await self.manager.save_currency_data(*changed)
+        finally:
+            self.manager.account_locks.release(self._stripes)
+        return False
+
+    def account(self, user_id):
+        """The locked `UserAccount` of a participant."""
+        return self.accounts[user_id]
+
+    def require(self, user_id, amount, field="wallet"):
+        """
+        Check that a participant can spend an amount.
+        :param user_id: The participant.
+        :param amount: The amount needed.
+        :param field: The balance to check ("wallet" or "bank").
+        :raises InsufficientFunds: If the balance is too low.
+        """
+        available = getattr(self.accounts[user_id], field)
+        if available < amount:
+            raise InsufficientFunds(user_id, field, amount, available)
+
+    def debit(self, user_id, amount, field="wallet"):
+        """Take an amount from a participant's balance, if they can afford it."""
+        self.require(user_id, amount, field)
+        account = self.accounts[user_id]
+        setattr(account, field, getattr(account, field) - amount)
+
+    def credit(self, user_id, amount, field="wallet"):
+        """Add an amount to a participant's balance."""
+        account = self.accounts[user_id]
+        setattr(account, field, getattr(account, field) + amount)
+
+    def transfer(self, payer_id, payee_id, amount, payer_field="wallet", payee_field="wallet"):
+        """
+        Move an amount between two balances, which may belong to the same
+        participant (e.g., wallet to bank).
+        :raises InsufficientFunds: If the payer cannot afford it.
+        """
+        self.debit(payer_id, amount, payer_field)
+        self.credit(payee_id, amount, payee_field)